@@ -0,0 +1,173 @@
+"""
+This module builds the FastAPI application of the self-learning application backend.
+
+``create_app`` is the only place the application is assembled. The route modules, and through
+them SQLAlchemy, httpx and the other dependencies, are imported inside the factory rather than
+when ``backend`` is imported, and the time each step takes is kept in a startup report. The
+report is logged once the application has started and exported at ``/metrics`` as
+``app_startup_seconds``, so cold starts of new workers can be measured and compared.
+
+Print the report of a fresh process, including the startup event, with:
+
+    python -m backend.application
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+from .config import Settings, get_settings, use_settings
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """
+    Time spent in each phase of building and starting the application.
+
+    Import phases only count the modules not already loaded by an earlier phase, so the phases
+    add up to the total cold start time.
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times the enclosed block as the phase ``name``.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def as_dict(self):
+        """
+        Returns the report with the durations in seconds.
+
+        Returns:
+            dict: The total and the duration of every phase, in the order they ran.
+        """
+        return {
+            "total_seconds": round(sum(self.phases.values()), 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+        }
+
+
+def _apply_settings(settings: Settings):
+    """
+    Makes ``settings`` the process-wide settings before the modules reading them are imported.
+
+    Raises:
+        RuntimeError: If the backend modules were already loaded with different settings.
+    """
+    if settings == get_settings():
+        return
+    if "backend.database" in sys.modules:
+        raise RuntimeError("The backend modules are already loaded with other settings; use one Settings per process.")
+    use_settings(settings)
+
+
+def create_app(settings: Settings = None):
+    """
+    Builds the FastAPI application.
+
+    Args:
+        settings (Settings, optional): The settings to run with. Defaults to the settings read from the environment.
+            Modules read the settings once, when first imported, so a process can only use one set.
+
+    Returns:
+        FastAPI: The application, with its startup report in ``app.state.startup_report``.
+    """
+    report = StartupReport()
+    if settings is not None:
+        _apply_settings(settings)
+    settings = get_settings()
+
+    with report.phase("import fastapi"):
+        from fastapi import FastAPI
+    with report.phase("import backend.database"):
+        from .database import dispose_engines, init_db
+    with report.phase("import backend.metrics"):
+        from .metrics import STARTUP_SECONDS, MetricsMiddleware, instrument_engines, metrics_routes
+    with report.phase("import backend.auth"):
+        from .auth import auth_routes
+    with report.phase("import backend.books"):
+        from .books import books_routes, cache_warmer
+    with report.phase("import backend.user_management"):
+        from .user_management import user_management_routes
+    with report.phase("import remaining modules"):
+        from .compression import CompressionMiddleware
+        from .http_client import close_http_client, start_http_client
+        from .password_hashing import shutdown_hash_pool, start_hash_pool
+        from .progress_buffer import progress_buffer
+        from .recommender import start_catalog_loading, warm_recommender
+        from .responses import FastJSONResponse
+
+    with report.phase("build app"):
+        app = FastAPI(default_response_class=FastJSONResponse)
+        app.state.startup_report = report
+
+        # Compress large responses with Brotli or gzip
+        app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_bytes)
+
+        # Record request latency and SQL activity per route, exported at /metrics
+        app.add_middleware(MetricsMiddleware)
+        instrument_engines()
+
+        app.include_router(auth_routes, prefix="/auth")
+        app.include_router(books_routes, prefix="/books")
+        app.include_router(user_management_routes, prefix="/users")
+        app.include_router(metrics_routes)
+
+        @app.get("/")
+        def read_root():
+            return {"message": "Welcome to the Self-Learning App API!"}
+
+    # Event triggered on startup to migrate the database and start the background workers
+    @app.on_event("startup")
+    async def startup_event():
+        with report.phase("startup init_db"):
+            init_db()
+        with report.phase("startup recommender"):
+            await warm_recommender()
+        with report.phase("startup workers"):
+            await start_http_client()
+            start_hash_pool()
+            progress_buffer.start()
+            start_catalog_loading()
+            cache_warmer.start()
+        for name, seconds in report.phases.items():
+            STARTUP_SECONDS.set(seconds, phase=name)
+        logger.info("Startup report: %s", json.dumps(report.as_dict()))
+
+    # Event triggered on shutdown to flush buffered progress and release pooled connections
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await cache_warmer.stop()
+        await progress_buffer.stop()
+        await close_http_client()
+        shutdown_hash_pool()
+        await dispose_engines()
+
+    return app
+
+
+async def _start_and_stop(app):
+    async with app.router.lifespan_context(app):
+        pass
+
+
+def main():
+    app = create_app()
+    asyncio.run(_start_and_stop(app))
+    print(json.dumps(app.state.startup_report.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
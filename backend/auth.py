@@ -6,22 +6,77 @@ All routes follow PEP8 style guidelines and adhere to GDPR compliance for secure
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import sys
+import time
 
-from .database import get_db
+from .cache import SharedCache, TTLCache
+from .config import get_settings
+from .database import get_async_db, get_async_read_db
+from .metrics import register_cache
+from .password_hashing import hash_password, verify_and_update, verify_password_async
+from .schemas import Message, Token, UserOut
 from backend.database.models import User
 
-# Create the password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT secret key and algorithm
 SECRET_KEY = "your-secret-key-here"  # Hard-coded secret key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Reads the token from an "Authorization: Bearer <token>" header when present
+bearer_scheme = HTTPBearer(auto_error=False)
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated user as seen by protected routes.
+    """
+    id: int
+    username: str
+    email: Optional[str]
+    created_at: Optional[datetime]
+
+settings = get_settings()
+
+if settings.shared_cache_path:
+    # Principals and generations shared by every worker process, so an invalidation reaches all of them
+    principal_cache = SharedCache(
+        settings.shared_cache_path,
+        "principal",
+        max_entries=settings.principal_cache_max_entries,
+        ttl=settings.principal_cache_ttl_seconds,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+    )
+    _principal_generations = SharedCache(
+        settings.shared_cache_path,
+        "principal_generation",
+        max_entries=settings.principal_cache_max_entries,
+        ttl=settings.principal_cache_ttl_seconds,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+    )
+else:
+    # Principals resolved from tokens, cached until the token expires
+    principal_cache = TTLCache(
+        max_entries=settings.principal_cache_max_entries,
+        ttl=settings.principal_cache_ttl_seconds,
+        sizeof=sys.getsizeof,
+    )
+
+    # Bumped whenever a user's profile changes, so principals cached before the change are ignored.
+    # Entries outlive the principals cached before them, so expiring them does not revive those.
+    _principal_generations = TTLCache(
+        max_entries=settings.principal_cache_max_entries,
+        ttl=settings.principal_cache_ttl_seconds,
+        sizeof=sys.getsizeof,
+    )
+register_cache("principal", principal_cache)
+
 # Create the FastAPI router for authentication routes
 auth_routes = APIRouter()
 
@@ -29,18 +84,23 @@ def get_password_hash(password: str):
     """
     Hashes the provided password using bcrypt.
 
+    This runs on the calling thread; request handlers should use
+    ``backend.password_hashing.hash_password_async`` instead.
+
     Args:
         password (str): The plain-text password to hash.
 
     Returns:
         str: The hashed password.
     """
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def verify_password(plain_password: str, hashed_password: str):
     """
     Verifies that the provided plain-text password matches the hashed password.
 
+    This runs on the calling thread; request handlers should use ``verify_password_async`` instead.
+
     Args:
         plain_password (str): The plain-text password to verify.
         hashed_password (str): The hashed password to compare against.
@@ -48,7 +108,7 @@ def verify_password(plain_password: str, hashed_password: str):
     Returns:
         bool: True if the password matches, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update(plain_password, hashed_password)[0]
 
 def create_access_token(data: dict):
     """
@@ -60,6 +120,8 @@ def create_access_token(data: dict):
     Returns:
         str: The JWT token.
     """
+    from jose import jwt  # Imported on first use, python-jose is slow to import
+
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -72,7 +134,7 @@ from fastapi import APIRouter
 auth_routes = APIRouter()
 
 # Example route
-@auth_routes.post("/register")
+@auth_routes.post("/register", response_model=Message)
 def register_user(username: str, password: str):
     """
     This is a sample route for user registration.
@@ -80,45 +142,130 @@ def register_user(username: str, password: str):
     """
     return {"message": f"User {username} registered successfully!"}
 
-@auth_routes.post("/login")
-def login_user(username: str, password: str, db: Session = Depends(get_db)):
+@auth_routes.post("/login", response_model=Token)
+async def login_user(username: str, password: str, db: AsyncSession = Depends(get_async_db)):
     """
     Authenticates a user by verifying their password and returning a JWT token.
 
+    The bcrypt check runs in the password hashing process pool. If the stored hash uses an
+    outdated cost factor it is replaced with a fresh hash.
+
     Args:
         username (str): The username of the user attempting to log in.
         password (str): The password of the user attempting to log in.
-        db (Session): The database session dependency.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         dict: A JWT token for the authenticated user.
     """
-    db_user = db.query(User).filter(User.username == username).first()
+    db_user = await db.scalar(select(User).where(User.username == username))
     if not db_user:
         raise HTTPException(status_code=400, detail="Invalid username or password")
     
-    if not verify_password(password, db_user.password_hash):
+    password_ok, new_hash = await verify_password_async(password, db_user.password_hash)
+    if not password_ok:
         raise HTTPException(status_code=400, detail="Invalid username or password")
+
+    if new_hash:
+        db_user.password_hash = new_hash
+        await db.commit()
     
     access_token = create_access_token(data={"sub": db_user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@auth_routes.get("/me")
-def get_current_user(token: str):
+def _next_generation(generation):
+    # Starting from the clock keeps generations increasing after an expired entry was dropped,
+    # and tells get_current_user whether a bump happened after it started loading a user.
+    return max((generation or 0) + 1, time.time_ns())
+
+def _bump_shared_generation(user_id: int):
+    # Other workers may bump the same user concurrently, so retry until the increment lands.
+    while True:
+        generation, version = _principal_generations.get_versioned(user_id)
+        if _principal_generations.compare_and_set(user_id, _next_generation(generation), version):
+            return
+
+async def invalidate_principal(user_id: int):
     """
-    Retrieves the current user's data based on the provided JWT token.
+    Drops every cached principal of a user. Call this after the user's profile is updated or deleted.
+
+    With a shared cache the update may wait for other processes holding its write lock, so it
+    runs in a worker thread rather than on the event loop.
 
     Args:
-        token (str): The JWT token from the authorization header.
+        user_id (int): The ID of the changed user.
+    """
+    if isinstance(_principal_generations, SharedCache):
+        await asyncio.to_thread(_bump_shared_generation, user_id)
+        return
+    _principal_generations.set(user_id, _next_generation(_principal_generations.get(user_id)))
+
+def _credentials_error():
+    return HTTPException(status_code=401, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+
+async def get_current_user(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Resolves the authenticated user from a JWT token, for use as a route dependency.
+
+    The token is read from the ``Authorization: Bearer`` header, or from the ``token`` query
+    parameter. Resolved principals are cached per token until the token expires, so repeated
+    requests skip both the signature check and the user lookup. A principal whose user was
+    invalidated while it was being loaded is returned but not cached, as it may predate the change.
+
+    Args:
+        token (str, optional): The JWT token, if sent as a query parameter.
+        credentials (HTTPAuthorizationCredentials, optional): The bearer token from the authorization header.
+        db (AsyncSession): The read-only database session dependency.
 
     Returns:
-        dict: The user's data extracted from the token.
+        Principal: The authenticated user.
     """
+    if credentials is not None:
+        token = credentials.credentials
+    if not token:
+        raise _credentials_error()
+
+    cached = principal_cache.get(token)
+    if cached is not None:
+        principal, generation = cached
+        if generation == _principal_generations.get(principal.id, 0):
+            return principal
+
+    from jose import JWTError, jwt  # Imported on first use, python-jose is slow to import
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Could not validate credentials")
-        return {"username": username}
     except JWTError:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
+        raise _credentials_error()
+    username: str = payload.get("sub")
+    if username is None:
+        raise _credentials_error()
+
+    loading_since = time.time_ns()
+    db_user = await db.scalar(select(User).where(User.username == username))
+    if db_user is None:
+        raise _credentials_error()
+
+    principal = Principal(id=db_user.id, username=db_user.username, email=db_user.email, created_at=db_user.created_at)
+    generation = _principal_generations.get(principal.id, 0)
+    ttl = min(payload["exp"] - time.time(), principal_cache.ttl)
+    if ttl > 0 and generation < loading_since:
+        principal_cache.set(token, (principal, generation), ttl=ttl)
+    return principal
+
+@auth_routes.get("/me", response_model=UserOut)
+async def read_current_user(current_user: Principal = Depends(get_current_user)):
+    """
+    Retrieves the current user's data based on the provided JWT token.
+
+    Args:
+        current_user (Principal): The authenticated user.
+
+    Returns:
+        dict: The user's ID, username, email and creation date.
+    """
+    return asdict(current_user)
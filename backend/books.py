@@ -5,167 +5,810 @@ It includes routes for searching books by genre, marking books as read, and mana
 All routes follow PEP8 style guidelines and adhere to GDPR compliance for secure handling of user data.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .database import get_db
-from .database.models import User, Book  # Corrected Import
-from .auth import get_current_user  # Assuming you have this function to get the current user
-import requests
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_db, get_async_read_db, AsyncReadSessionLocal
+from .database.models import Book, User
+from .auth import Principal, get_current_user
+from .cache import SharedCache, SQLiteCacheStore, TTLCache
+from .cache_warmer import CacheWarmer
+from .config import get_settings
+from .http_client import get_http_client
+from .metrics import observe_upstream, register_cache, register_stats
+from .http_caching import PRIVATE_REVALIDATE, content_etag, etag_matches, make_etag, not_modified
+from .resilience import CircuitBreaker, UpstreamGuard, UpstreamUnavailable
+from .responses import FastJSONResponse, dumps
+from .search_index import index_volumes, search_local
+from .singleflight import SingleFlight
+from .reading_stats import get_reading_stats, record_progress
+from .progress_buffer import progress_buffer
+from .recommender import add_to_catalog, invalidate_profile, recommend, user_profile
+from .schemas import (
+    AddedBooks, BatchResults, BookOperation, Message, MyBooksPage, ReadingStats, Recommendations,
+    SearchPathStatus, SearchResults,
+)
+from urllib.parse import quote
+import asyncio
+import math
+import re
+import time
 
 # Create the FastAPI router for book-related routes
 books_routes = APIRouter()
 
-GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+settings = get_settings()
 
-def search_books_api(keyword: str):
+GOOGLE_BOOKS_API_URL = settings.google_books_api_url
+
+# Characters of Google Books volume IDs, e.g. "zyTCAlFPjgYC"; anything else never reaches the upstream URL
+VOLUME_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Deadline, circuit breaker and hedging for every Google Books call
+google_books = UpstreamGuard(
+    deadline=settings.upstream_deadline_seconds,
+    slow_call=settings.upstream_slow_call_seconds,
+    breaker=CircuitBreaker(
+        failure_ratio=settings.upstream_breaker_failure_ratio,
+        window=settings.upstream_breaker_window,
+        min_calls=settings.upstream_breaker_min_calls,
+        open_seconds=settings.upstream_breaker_open_seconds,
+    ),
+    hedge=settings.upstream_hedge,
+    hedge_min_delay=settings.upstream_hedge_min_delay_seconds,
+)
+
+if settings.shared_cache_path:
+    # Search results and volumes shared by every worker process of the host
+    search_cache = SharedCache(
+        settings.shared_cache_path,
+        "search",
+        max_entries=settings.search_cache_max_entries,
+        max_bytes=settings.search_cache_max_bytes,
+        ttl=settings.search_cache_ttl_seconds,
+        stale_ttl=settings.search_cache_stale_seconds,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+    )
+    volume_cache = SharedCache(
+        settings.shared_cache_path,
+        "volume",
+        max_entries=settings.volume_cache_max_entries,
+        max_bytes=settings.volume_cache_max_bytes,
+        ttl=settings.volume_cache_ttl_seconds,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+    )
+else:
+    # Cache of Google Books search results, keyed by the normalized query
+    search_cache = TTLCache(
+        max_entries=settings.search_cache_max_entries,
+        max_bytes=settings.search_cache_max_bytes,
+        ttl=settings.search_cache_ttl_seconds,
+        stale_ttl=settings.search_cache_stale_seconds,
+        store=SQLiteCacheStore(settings.search_cache_path) if settings.search_cache_path else None,
+    )
+
+    # Cache of single-volume lookups, keyed by the Google Books volume ID
+    volume_cache = TTLCache(
+        max_entries=settings.volume_cache_max_entries,
+        max_bytes=settings.volume_cache_max_bytes,
+        ttl=settings.volume_cache_ttl_seconds,
+    )
+
+# Concurrent misses for the same query or volume share one upstream call
+search_flight = SingleFlight()
+volume_flight = SingleFlight()
+
+# Exported at /metrics
+register_cache("search", search_cache)
+register_cache("volume", volume_cache)
+register_stats("singleflight", search_flight.stats, flight="search")
+register_stats("singleflight", volume_flight.stats, flight="volume")
+register_stats("upstream", google_books.stats, upstream="google_books")
+register_stats("progress_buffer", progress_buffer.stats)
+
+# Upper bound on the number of IDs accepted by /add_books
+MAX_BATCH_ADD = 100
+
+# Columns that can be requested from /my_books with the fields= parameter
+MY_BOOKS_COLUMNS = {
+    "id": Book.id,
+    "title": Book.title,
+    "author": Book.author,
+    "description": Book.description,
+    "pages_read": Book.pages_read,
+    "is_favorite": Book.is_favorite,
+}
+MY_BOOKS_PAGE_SIZE = 100
+MY_BOOKS_MAX_PAGE_SIZE = 500
+MY_BOOKS_STREAM_BATCH = 500
+
+# Upper bound on the number of operations accepted by /batch
+MAX_BATCH_OPERATIONS = 500
+
+# Queries currently being refreshed in the background, and the tasks doing it
+_refreshing = set()
+_background_tasks = set()
+
+def normalize_query(keyword: str):
+    """
+    Normalizes a search keyword so equivalent queries share one cache entry.
+
+    Args:
+        keyword (str): The raw search keyword.
+
+    Returns:
+        str: The keyword in lower case with collapsed whitespace.
+    """
+    return " ".join(keyword.lower().split())
+
+def _refresh_in_background(query: str):
+    """
+    Re-fetches a stale cached query in a background task, at most once at a time per query.
+
+    Args:
+        query (str): The normalized search query.
+    """
+    if query in _refreshing:
+        return
+    _refreshing.add(query)
+
+    async def refresh():
+        try:
+            await fetch_into_cache(query)
+        except HTTPException:
+            pass  # Keep serving the stale entry until the next attempt
+        finally:
+            _refreshing.discard(query)
+
+    task = asyncio.create_task(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def search_books_api(keyword: str):
+    """
+    Returns books related to a specific keyword (genre or topic), served from the search cache when possible.
+
+    Fresh cache entries are returned directly. Stale entries are returned immediately
+    while a background refresh fetches new results from Google Books.
+
+    Args:
+        keyword (str): The search keyword (e.g., genre or topic).
+
+    Returns:
+        list: A list of books (with title, author, and description) matching the search criteria.
+    """
+    query = normalize_query(keyword)
+    cached = search_cache.lookup(query)
+    if cached is not None:
+        books, is_stale = cached
+        if is_stale:
+            _refresh_in_background(query)
+        return books
+
+    return await fetch_into_cache(query)
+
+async def fetch_into_cache(query: str):
+    """
+    Fetches a query from Google Books and stores the results in the search cache.
+
+    Concurrent calls for the same query are coalesced into a single upstream request.
+
+    Args:
+        query (str): The normalized search query.
+
+    Returns:
+        list: A list of books (with title, author, and description) matching the query.
+    """
+    async def fetch():
+        books = await fetch_search_results(query)
+        search_cache.set(query, books)
+        return books
+
+    return await search_flight.do(query, fetch)
+
+async def _warm_search_query(query: str):
+    """
+    Fetches a query from Google Books into the search cache, for the cache warmer.
+
+    Args:
+        query (str): The normalized search query.
+
+    Returns:
+        int: The number of books found.
+    """
+    # With a shared cache, another worker's warmer may have refreshed the query moments ago
+    age = search_cache.age(query)
+    if age is not None and age < cache_warmer.interval / 2:
+        cached = search_cache.lookup(query)
+        if cached is not None:
+            return len(cached[0])
+    return len(await fetch_into_cache(query))
+
+# Keeps the genres offered by the UI in the search cache, started from the startup event
+cache_warmer = CacheWarmer(
+    [normalize_query(query) for query in settings.cache_warm_queries.split(",") if query.strip()],
+    refresh=_warm_search_query,
+    interval=settings.cache_warm_interval_seconds,
+    jitter=settings.cache_warm_jitter_seconds,
+)
+
+async def google_books_get(url: str, params: dict = None, endpoint: str = "google_books"):
+    """
+    Sends a GET request to the Google Books API through the upstream guard.
+
+    Args:
+        url (str): The request URL.
+        params (dict, optional): The query parameters.
+        endpoint (str): The endpoint name the call latency is recorded under.
+
+    Returns:
+        httpx.Response: The upstream response.
+
+    Raises:
+        HTTPException: 503 while the circuit is open, 504 when the deadline passed, 502 on transport errors.
+    """
+    started = time.perf_counter()
+    try:
+        response = await google_books.call(lambda: get_http_client().get(url, params=params))
+    except UpstreamUnavailable as e:
+        observe_upstream(endpoint, time.perf_counter() - started, e.reason)
+        if e.reason == "circuit_open":
+            raise HTTPException(
+                status_code=503,
+                detail="Google Books API is temporarily unavailable.",
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+        if e.reason == "deadline":
+            raise HTTPException(status_code=504, detail="Google Books API did not answer in time.")
+        raise HTTPException(status_code=502, detail="Error fetching data from Google Books API.")
+    observe_upstream(endpoint, time.perf_counter() - started, str(response.status_code))
+    return response
+
+async def fetch_search_results(query: str):
     """
     Queries the Google Books API for books related to a specific keyword (genre or topic).
     
     Args:
-        keyword (str): The search keyword (e.g., genre or topic).
+        query (str): The search keyword (e.g., genre or topic).
     
     Returns:
         list: A list of books (with title, author, and description) matching the search criteria.
     """
-    response = requests.get(f"{GOOGLE_BOOKS_API_URL}?q={keyword}")
+    response = await google_books_get(GOOGLE_BOOKS_API_URL, params={"q": query}, endpoint="google_books_search")
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Error fetching data from Google Books API.")
     
-    books_data = response.json().get("items", [])
-    return [
-        {
-            "id": book["id"],
-            "title": book["volumeInfo"].get("title", "No title available"),
-            "author": ", ".join(book["volumeInfo"].get("authors", ["Unknown author"])),
-            "description": book["volumeInfo"].get("description", "No description available")
-        }
-        for book in books_data
-    ]
+    try:
+        books = [_parse_volume(book) for book in response.json().get("items", [])]
+    except (ValueError, LookupError, TypeError, AttributeError):
+        raise _malformed_response()
 
-@books_routes.get("/search_books/{genre}")
-def search_books(genre: str, db: Session = Depends(get_db)):
+    # Feed the local search index and the recommender with everything that passes through
+    await ingest_volumes(books)
+    return books
+
+async def ingest_volumes(volumes: list):
+    """
+    Adds volumes seen by the service to the local search index and the recommender catalog.
+
+    Args:
+        volumes (list): Volumes with ``id``, ``title``, ``author`` and ``description`` keys.
+    """
+    await index_volumes(volumes)
+    await add_to_catalog(volumes)
+
+def _parse_volume(book: dict):
+    """
+    Extracts the fields the application uses from a Google Books volume resource.
+
+    Args:
+        book (dict): A volume resource as returned by the Google Books API.
+
+    Returns:
+        dict: The volume ID, title, author and description.
+    """
+    volume_info = book.get("volumeInfo") or {}
+    return {
+        "id": book["id"],
+        "title": volume_info.get("title", "No title available"),
+        "author": ", ".join(volume_info.get("authors", ["Unknown author"])),
+        "description": volume_info.get("description", "No description available")
+    }
+
+def _malformed_response():
+    return HTTPException(status_code=502, detail="Malformed response from Google Books API.")
+
+async def bump_library_version(db: AsyncSession, user_id: int):
+    """
+    Records that a user's books changed, so cached copies of /my_books are revalidated. Runs in the caller's transaction.
+
+    Args:
+        db (AsyncSession): The database session holding the change.
+        user_id (int): The ID of the user whose books changed.
+    """
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(library_version=User.library_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def fetch_volume(volume_id: str):
+    """
+    Fetches the details of exactly one Google Books volume by its ID, using the volume cache.
+
+    Concurrent misses for the same volume are coalesced into a single upstream request.
+
+    Args:
+        volume_id (str): The Google Books volume ID.
+
+    Returns:
+        dict: The volume ID, title, author and description.
+
+    Raises:
+        HTTPException: 400 if the ID is not a Google Books volume ID.
+    """
+    if not VOLUME_ID_PATTERN.fullmatch(volume_id):
+        raise HTTPException(status_code=400, detail="Invalid Google Books volume ID.")
+    cached = volume_cache.get(volume_id)
+    if cached is not None:
+        return cached
+    return await volume_flight.do(volume_id, lambda: _fetch_volume_into_cache(volume_id))
+
+async def _fetch_volume_into_cache(volume_id: str):
+    """
+    Fetches one volume from the Google Books API and stores it in the volume cache.
+
+    Args:
+        volume_id (str): The Google Books volume ID.
+
+    Returns:
+        dict: The volume ID, title, author and description.
+    """
+    response = await google_books_get(f"{GOOGLE_BOOKS_API_URL}/{quote(volume_id, safe='')}", endpoint="google_books_volume")
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Book not found in Google Books.")
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Error fetching data from Google Books API.")
+
+    try:
+        book_data = _parse_volume(response.json())
+    except (ValueError, LookupError, TypeError, AttributeError):
+        raise _malformed_response()
+    volume_cache.set(volume_id, book_data)
+    return book_data
+
+@books_routes.get("/search_books/{genre}", response_model=SearchResults)
+async def search_books(genre: str, response: Response, local_first: bool = False, if_none_match: Optional[str] = Header(None)):
     """
     Searches for books based on a genre and returns a list of recommended books.
+
+    When Google Books fails or is unavailable and the query is not cached, the local search
+    index answers instead, if it has matches. The ETag is derived from the cached results, so
+    a client polling with ``If-None-Match`` gets an empty 304 until they change.
     
     Args:
         genre (str): The selected genre for book recommendations.
-        db (Session): The database session dependency.
+        response (Response): The response, used to set the caching headers.
+        local_first (bool): Answer from the local search index, falling back to Google Books only on a miss.
+        if_none_match (str, optional): The ETag of the results the client already has.
     
     Returns:
-        dict: A dictionary containing the list of recommended books.
+        dict: A dictionary containing the list of recommended books and where they came from.
+    """
+    result = await _find_books(genre, local_first)
+    etag = content_etag(result)
+    cache_control = f"public, max-age={settings.search_max_age_seconds}"
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return result
+
+async def _find_books(genre: str, local_first: bool):
     """
+    Finds the books for a search, from the local index or the (cached) Google Books results.
+    """
+    if local_first:
+        books = await search_local(genre)
+        if books:
+            return {"books": books, "source": "local"}
+
     try:
-        books = search_books_api(genre)
-        return {"books": books}
+        books = await search_books_api(genre)
+        return {"books": books, "source": "upstream"}
     except HTTPException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.detail)
+        if e.status_code >= 500 and not local_first:
+            books = await search_local(genre)
+            if books:
+                return {"books": books, "source": "local"}
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
 
-@books_routes.post("/add_book")
-def add_book_to_user(book_id: str, db: Session = Depends(get_db), user: User = Depends(get_current_user)):  # Corrected user dependency
+@books_routes.get("/search_cache", response_model=SearchPathStatus)
+async def get_search_cache_status():
+    """
+    Reports the state of the search path: the search cache, when each warmed query was last
+    refreshed, how many upstream calls were coalesced, and the health of the Google Books calls.
+
+    Returns:
+        dict: The search cache counters, the status of every warmed query, the single-flight counters and the upstream guard state.
+    """
+    return {
+        "cache": search_cache.stats(),
+        "warm_queries": cache_warmer.status(),
+        "coalescing": {"search": search_flight.stats(), "volume": volume_flight.stats()},
+        "upstream": google_books.stats(),
+    }
+
+@books_routes.post("/add_book", response_model=Message)
+async def add_book_to_user(book_id: str, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_user)):
     """
     Adds a selected book to the user's book list.
     
     Args:
         book_id (str): The ID of the selected book.
-        db (Session): The database session dependency.
-        user (User): The authenticated user.
+        db (AsyncSession): The database session dependency.
+        user (Principal): The authenticated user.
     
     Returns:
         dict: A success message indicating the book was added to the user's list.
     """
     # Fetch the book details from Google Books API
-    book_data = search_books_api(book_id)[0]  # Assuming the book is unique
+    book_data = await fetch_volume(book_id)
     
     # Add the book to the user's list
     new_book = Book(title=book_data["title"], author=book_data["author"], user_id=user.id, description=book_data["description"])
     db.add(new_book)
-    db.commit()
-    db.refresh(new_book)
+    await bump_library_version(db, user.id)
+    await db.commit()
+    invalidate_profile(user.id)
+    await ingest_volumes([book_data])
 
     return {"message": f"Book '{book_data['title']}' added to your list."}
 
-@books_routes.post("/mark_read")
-def mark_book_as_read(book_id: str, pages_read: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):  # Corrected user dependency
+@books_routes.post("/add_books", response_model=AddedBooks)
+async def add_books_to_user(book_ids: List[str] = Body(..., embed=True), db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_user)):
+    """
+    Adds several books to the user's book list in one request.
+
+    The volume details are fetched concurrently and all books are inserted in a single transaction.
+    Books whose details cannot be fetched are reported back instead of failing the whole batch.
+
+    Args:
+        book_ids (List[str]): The Google Books volume IDs to add.
+        db (AsyncSession): The database session dependency.
+        user (Principal): The authenticated user.
+
+    Returns:
+        dict: The titles of the added books and the IDs that could not be added.
+    """
+    book_ids = list(dict.fromkeys(book_ids))  # Drop duplicates, keep the order
+    if len(book_ids) > MAX_BATCH_ADD:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ADD} books can be added at once.")
+
+    results = await asyncio.gather(*(fetch_volume(book_id) for book_id in book_ids), return_exceptions=True)
+
+    added, failed = [], []
+    for book_id, result in zip(book_ids, results):
+        if isinstance(result, HTTPException):
+            failed.append({"book_id": book_id, "detail": result.detail})
+        elif isinstance(result, Exception):
+            raise result
+        else:
+            added.append(result)
+
+    db.add_all([
+        Book(title=book_data["title"], author=book_data["author"], user_id=user.id, description=book_data["description"])
+        for book_data in added
+    ])
+    if added:
+        await bump_library_version(db, user.id)
+    await db.commit()
+    invalidate_profile(user.id)
+    await ingest_volumes(added)
+
+    return {"added": [book_data["title"] for book_data in added], "failed": failed}
+
+@books_routes.post("/mark_read", response_model=Message)
+async def mark_book_as_read(book_id: int, pages_read: int, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_user)):
     """
     Marks a book as read by the user and stores the progress.
+
+    With write-behind enabled the progress is buffered and written by the next flush of the
+    progress buffer; the ownership check is then only done on the first update of a book.
     
     Args:
-        book_id (str): The ID of the book to mark as read.
+        book_id (int): The ID of the book to mark as read.
         pages_read (int): The number of pages read by the user.
-        db (Session): The database session dependency.
-        user (User): The authenticated user.
+        db (AsyncSession): The database session dependency.
+        user (Principal): The authenticated user.
     
     Returns:
         dict: A success message indicating the book was marked as read.
     """
+    if progress_buffer.enabled:
+        title = progress_buffer.owned_book_title(user.id, book_id)
+        if title is None:
+            title = await db.scalar(select(Book.title).where(Book.id == book_id, Book.user_id == user.id))
+            if title is None:
+                raise HTTPException(status_code=404, detail="Book not found in your list.")
+            progress_buffer.remember_owned_book(user.id, book_id, title)
+        progress_buffer.put(user.id, book_id, pages_read)
+        return {"message": f"Book '{title}' marked as read. You have read {pages_read} pages."}
+
     # Find the book in the user's list
-    book = db.query(Book).filter(Book.id == book_id, Book.user_id == user.id).first()
+    book = await db.scalar(select(Book).where(Book.id == book_id, Book.user_id == user.id))
     if not book:
         raise HTTPException(status_code=404, detail="Book not found in your list.")
     
-    # Update the book's read status and progress
+    # Update the book's read status and progress, and log it for the reading statistics
+    await record_progress(db, user.id, [(book.id, book.pages_read, pages_read)])
     book.pages_read = pages_read
-    db.commit()
+    await bump_library_version(db, user.id)
+    await db.commit()
 
     return {"message": f"Book '{book.title}' marked as read. You have read {pages_read} pages."}
 
-@books_routes.post("/add_favorite")
-def add_book_to_favorites(book_id: str, db: Session = Depends(get_db), user: User = Depends(get_current_user)):  # Corrected user dependency
+@books_routes.post("/add_favorite", response_model=Message)
+async def add_book_to_favorites(book_id: str, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_user)):
     """
     Adds a selected book to the user's list of favorite books.
     
     Args:
         book_id (str): The ID of the selected book.
-        db (Session): The database session dependency.
-        user (User): The authenticated user.
+        db (AsyncSession): The database session dependency.
+        user (Principal): The authenticated user.
     
     Returns:
         dict: A success message indicating the book was added to favorites.
     """
     # Find the book in the user's list
-    book = db.query(Book).filter(Book.id == book_id, Book.user_id == user.id).first()
+    book = await db.scalar(select(Book).where(Book.id == book_id, Book.user_id == user.id))
     if not book:
         raise HTTPException(status_code=404, detail="Book not found in your list.")
     
     # Mark the book as a favorite
     book.is_favorite = True
-    db.commit()
+    await bump_library_version(db, user.id)
+    await db.commit()
+    invalidate_profile(user.id)
 
     return {"message": f"Book '{book.title}' added to your favorites."}
 
-@books_routes.post("/remove_favorite")
-def remove_book_from_favorites(book_id: str, db: Session = Depends(get_db), user: User = Depends(get_current_user)):  # Corrected user dependency
+@books_routes.post("/remove_favorite", response_model=Message)
+async def remove_book_from_favorites(book_id: str, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_user)):
     """
     Removes a book from the user's list of favorite books.
     
     Args:
         book_id (str): The ID of the selected book.
-        db (Session): The database session dependency.
-        user (User): The authenticated user.
+        db (AsyncSession): The database session dependency.
+        user (Principal): The authenticated user.
     
     Returns:
         dict: A success message indicating the book was removed from favorites.
     """
     # Find the book in the user's list
-    book = db.query(Book).filter(Book.id == book_id, Book.user_id == user.id).first()
+    book = await db.scalar(select(Book).where(Book.id == book_id, Book.user_id == user.id))
     if not book:
         raise HTTPException(status_code=404, detail="Book not found in your list.")
     
     # Remove the book from favorites
     book.is_favorite = False
-    db.commit()
+    await bump_library_version(db, user.id)
+    await db.commit()
+    invalidate_profile(user.id)
 
     return {"message": f"Book '{book.title}' removed from your favorites."}
 
-@books_routes.get("/my_books")
-def get_my_books(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+@books_routes.post("/batch", response_model=BatchResults, response_model_exclude_none=True)
+async def apply_book_operations(operations: List[BookOperation] = Body(..., embed=True), db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_user)):
+    """
+    Applies many reading-progress and favorite changes in one request.
+
+    Ownership of all books is checked with a single query and every change is written with a
+    single UPDATE statement in one transaction, together with the reading statistics. When a book appears in several operations of the
+    same kind, the last one wins. With write-behind enabled, progress changes are buffered like
+    those of /mark_read, so they are ordered with the updates already buffered.
+
+    Args:
+        operations (List[BookOperation]): The changes to apply, in order.
+        db (AsyncSession): The database session dependency.
+        user (Principal): The authenticated user.
+
+    Returns:
+        dict: One result per operation, in the order they were sent, and the number of updated books.
+    """
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_OPERATIONS} operations can be sent at once.")
+
+    book_ids = {operation.book_id for operation in operations}
+    owned = dict((await db.execute(
+        select(Book.id, Book.pages_read).where(Book.user_id == user.id, Book.id.in_(book_ids))
+    )).all())
+
+    pages_read, favorites, results = {}, {}, []
+    for operation in operations:
+        result = {"op": operation.op, "book_id": operation.book_id, "status": "ok"}
+        if operation.book_id not in owned:
+            result.update(status="error", detail="Book not found in your list.")
+        elif operation.op == "mark_read":
+            if operation.pages_read is None or operation.pages_read < 0:
+                result.update(status="error", detail="pages_read must be a non-negative number.")
+            else:
+                pages_read[operation.book_id] = operation.pages_read
+        else:
+            favorites[operation.book_id] = operation.op == "add_favorite"
+        results.append(result)
+
+    updated = len(set(pages_read) | set(favorites))
+    if progress_buffer.enabled:
+        # A direct write could be overwritten by an older value of a flush already running
+        for book_id, pages in pages_read.items():
+            progress_buffer.put(user.id, book_id, pages)
+        pages_read = {}
+
+    changed_ids = set(pages_read) | set(favorites)
+    if changed_ids:
+        values = {}
+        if pages_read:
+            values["pages_read"] = case(pages_read, value=Book.id, else_=Book.pages_read)
+        if favorites:
+            values["is_favorite"] = case(favorites, value=Book.id, else_=Book.is_favorite)
+        await db.execute(
+            update(Book)
+            .where(Book.user_id == user.id, Book.id.in_(changed_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await bump_library_version(db, user.id)
+        await record_progress(db, user.id, [(book_id, owned[book_id], pages) for book_id, pages in pages_read.items()])
+        await db.commit()
+        if favorites:
+            invalidate_profile(user.id)
+
+    return {"results": results, "updated": updated}
+
+@books_routes.get("/stats", response_model=ReadingStats)
+async def get_my_reading_stats(days: int = Query(30, ge=1, le=366), db: AsyncSession = Depends(get_async_read_db), user: Principal = Depends(get_current_user)):
+    """
+    Returns the reading statistics of the authenticated user.
+
+    The numbers come from rollup tables maintained on every progress update, so no reading
+    history is aggregated per request.
+
+    Args:
+        days (int): How many recent days of daily totals to include.
+        db (AsyncSession): The read-only database session dependency.
+        user (Principal): The authenticated user.
+
+    Returns:
+        dict: Total pages, progress updates, days read, current and longest streak, and recent daily totals.
     """
-    Fetch the books for the currently authenticated user.
+    return await get_reading_stats(db, user.id, days=days)
+
+@books_routes.get("/recommendations", response_model=Recommendations)
+async def get_recommendations(
+    genre: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_current_user),
+):
     """
-    # Use the ID of the currently logged-in user from the JWT token or session
-    user_id = current_user["id"]
+    Recommends books similar to the authenticated user's books, optionally steered towards a genre.
+
+    Recommendations are ranked by TF-IDF cosine similarity against every book the service has
+    seen, without calling Google Books. Books already in the user's list are left out.
+
+    Args:
+        genre (str, optional): A genre or topic to branch into.
+        limit (int): The maximum number of recommendations.
+        db (AsyncSession): The read-only database session dependency.
+        user (Principal): The authenticated user.
+
+    Returns:
+        dict: The recommended books (with id, title, author and score), best first.
+    """
+    profile, own_books = await user_profile(db, user.id)
+    return {"books": await recommend(profile, exclude_keys=own_books, limit=limit, genre=genre)}
+
+def _my_books_columns(fields: Optional[str]):
+    """
+    Resolves the fields= parameter of /my_books into the columns to select.
+
+    Args:
+        fields (str, optional): Comma-separated field names, or None for every field.
+
+    Returns:
+        list: The selected columns, always starting with the book ID.
+    """
+    if not fields:
+        return list(MY_BOOKS_COLUMNS.values())
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in MY_BOOKS_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}.")
+    return [Book.id] + [MY_BOOKS_COLUMNS[name] for name in dict.fromkeys(names) if name != "id"]
+
+def _my_books_query(user_id: int, columns: list, cursor: int):
+    """
+    Builds the keyset query for a user's books after the given cursor, ordered by ID.
+    """
+    return select(*columns).where(Book.user_id == user_id, Book.id > cursor).order_by(Book.id)
+
+def _with_buffered_progress(book: dict, buffered: dict):
+    """
+    Replaces a book's pages_read with the value waiting in the write-behind buffer, if any.
+    """
+    if buffered and "pages_read" in book and book["id"] in buffered:
+        book["pages_read"] = buffered[book["id"]]
+    return book
+
+async def _stream_my_books(user_id: int, columns: list, cursor: int):
+    """
+    Yields a user's books as NDJSON lines, fetching rows from the database in small batches.
+
+    The generator owns its session because it keeps running after the request dependencies are closed.
+    """
+    buffered = progress_buffer.pending_for_user(user_id)
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(_my_books_query(user_id, columns, cursor).execution_options(yield_per=MY_BOOKS_STREAM_BATCH))
+        async for row in result:
+            yield dumps(_with_buffered_progress(dict(row._mapping), buffered)) + b"\n"
+
+@books_routes.get("/my_books", response_model=MyBooksPage, response_model_exclude_unset=True)
+async def get_my_books(
+    cursor: int = 0,
+    limit: int = Query(MY_BOOKS_PAGE_SIZE, ge=1, le=MY_BOOKS_MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Fetch the books for the currently authenticated user, one page at a time.
+
+    Pages are ordered by book ID. Pass the returned ``next_cursor`` as ``cursor`` to get the next page.
+    With ``format=ndjson`` every book after the cursor is streamed as one JSON object per line
+    and ``limit`` is ignored. Both formats are encoded straight from the selected columns,
+    which keeps serialization cheap for large lists.
+
+    The ETag is derived from the user's library version, bumped by every change to their books,
+    and from their buffered progress. A client sending it back in ``If-None-Match`` gets an
+    empty 304 response without any book being read.
+
+    Args:
+        cursor (int): Only return books with an ID greater than this value.
+        limit (int): The maximum number of books in the page.
+        fields (str, optional): Comma-separated fields to return, e.g. ``title,author``. The ID is always included.
+        format (str): ``json`` for a page, ``ndjson`` for a stream.
+        if_none_match (str, optional): The ETag of the page the client already has.
+        db (AsyncSession): The database session dependency.
+        current_user (Principal): The authenticated user.
+
+    Returns:
+        dict: The page of books and the cursor of the next page (None on the last page).
+    """
+    user_id = current_user.id
+    columns = _my_books_columns(fields)
+
+    library_version = await db.scalar(select(User.library_version).where(User.id == user_id))
+    etag = make_etag(user_id, library_version, progress_buffer.version_token(user_id), cursor, limit, fields or "", format)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
+    headers = {"ETag": etag, "Cache-Control": PRIVATE_REVALIDATE}
+
+    if format == "ndjson":
+        return StreamingResponse(_stream_my_books(user_id, columns, cursor), media_type="application/x-ndjson", headers=headers)
 
-    # Query the books table to get books for the authenticated user
-    books = db.query(Book).filter_by(user_id=user_id).all()
+    # Fetch one extra row to know whether another page follows
+    rows = (await db.execute(_my_books_query(user_id, columns, cursor).limit(limit + 1))).all()
+    buffered = progress_buffer.pending_for_user(user_id)
+    books = [_with_buffered_progress(dict(row._mapping), buffered) for row in rows[:limit]]
+    next_cursor = books[-1]["id"] if len(rows) > limit else None
 
-    return {"books": books}
+    # The rows only hold the selected columns, so they are encoded directly without per-item validation
+    return FastJSONResponse({"books": books, "next_cursor": next_cursor}, headers=headers)
@@ -0,0 +1,665 @@
+"""
+This module provides the result cache used in front of slow upstream calls such as the
+Google Books API.
+
+The cache keeps entries in least-recently-used order, bounded both by entry count and by
+an approximate memory budget. Each entry carries a time-to-live plus a stale window during
+which it may still be served while the caller refreshes it in the background. An optional
+SQLite file can back the cache so warm entries survive a restart.
+
+``SharedCache`` offers the same interface on top of an SQLite file in WAL mode, so the worker
+processes of a host share one warm cache instead of each filling its own.
+"""
+
+import json
+import logging
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def _json_size(value):
+    """
+    Estimates the memory footprint of a cached value from its JSON encoding.
+
+    Args:
+        value: The value to measure.
+
+    Returns:
+        int: The approximate size of the value in bytes.
+    """
+    try:
+        return len(json.dumps(value))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class CacheEntry:
+    """
+    A single cached value together with its freshness information.
+    """
+
+    __slots__ = ("value", "stored_at", "expires_at", "stale_until", "size")
+
+    def __init__(self, value, stored_at, expires_at, stale_until, size):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+
+    def is_fresh(self, now):
+        return now < self.expires_at
+
+    def is_usable(self, now):
+        return now < self.stale_until
+
+
+class SQLiteCacheStore:
+    """
+    On-disk backing store for a TTLCache, kept in a small SQLite file.
+
+    Values must be JSON serializable. Writes are queued to a background writer thread, in order,
+    so the event loop never waits on a commit; the file lags the cache by the writes still queued.
+    Entries whose stale window has passed are purged every ``purge_interval`` seconds, and once
+    when the store opens, so rows nobody looks up again do not pile up.
+
+    Args:
+        path (str): The SQLite file, created if missing.
+        purge_interval (float): Seconds between two purges of the expired entries.
+    """
+
+    def __init__(self, path, purge_interval=300.0):
+        self.purge_interval = purge_interval
+        self._write_conn = sqlite3.connect(path, check_same_thread=False)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " stale_until REAL NOT NULL)"
+        )
+        self._write_conn.commit()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-store")
+        # Reads get their own connection, which WAL mode never makes wait for the writer
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._next_purge = 0.0
+
+    def _run_write(self, statement, params=()):
+        try:
+            self._write_conn.execute(statement, params)
+            self._write_conn.commit()
+        except sqlite3.Error as e:
+            # A lost cache write only costs a later miss
+            logger.warning("Dropped a write to the cache store: %s", e)
+
+    def _submit(self, statement, params=()):
+        self._writer.submit(self._run_write, statement, params)
+
+    def load(self, key):
+        """
+        Loads an entry from disk.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            tuple | None: ``(value, stored_at, expires_at, stale_until)`` or None if missing.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at, expires_at, stale_until FROM cache_entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2], row[3]
+
+    def save(self, key, entry):
+        """
+        Queues the write of an entry, replacing any previous value for the key.
+
+        The value is encoded right away, so later changes to it are not stored.
+
+        Args:
+            key (str): The cache key.
+            entry (CacheEntry): The entry to persist.
+        """
+        self._submit(
+            "INSERT OR REPLACE INTO cache_entries (key, value, stored_at, expires_at, stale_until)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(entry.value), entry.stored_at, entry.expires_at, entry.stale_until),
+        )
+        if entry.stored_at >= self._next_purge:
+            self.purge_expired(entry.stored_at)
+
+    def delete(self, key):
+        self._submit("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._submit("DELETE FROM cache_entries")
+
+    def purge_expired(self, now=None):
+        """
+        Queues the removal of the entries whose stale window has passed.
+
+        Args:
+            now (float, optional): The current time, defaults to ``time.time()``.
+        """
+        now = now or time.time()
+        self._next_purge = now + self.purge_interval
+        self._submit("DELETE FROM cache_entries WHERE stale_until <= ?", (now,))
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL, stale-while-revalidate and hit/miss counters.
+
+    Args:
+        max_entries (int): Maximum number of entries kept in memory.
+        max_bytes (int): Approximate memory budget for all cached values.
+        ttl (float): Default number of seconds an entry stays fresh.
+        stale_ttl (float): Number of seconds after expiry during which a stale entry may still be served.
+        store (SQLiteCacheStore, optional): Backing store that survives restarts. Entries evicted
+            or expired from memory are deleted from it as well.
+        sizeof (callable, optional): Function estimating the size of a value in bytes.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024, ttl=300.0, stale_ttl=0.0, store=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._store = store
+        self._sizeof = sizeof or _json_size
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _insert(self, key, entry):
+        """
+        Inserts an entry, then evicts least recently used entries until both limits are respected again.
+
+        Returns:
+            list: The keys of the evicted entries.
+        """
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        evicted = []
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            evicted.append(next(iter(self._entries)))
+            self._remove(evicted[-1])
+            self._stats["evictions"] += 1
+        return evicted
+
+    def _delete_from_store(self, keys):
+        if self._store is not None:
+            for key in keys:
+                self._store.delete(key)
+
+    def _load_from_store(self, key):
+        if self._store is None:
+            return None
+        row = self._store.load(key)
+        if row is None:
+            return None
+        value, stored_at, expires_at, stale_until = row
+        return CacheEntry(value, stored_at, expires_at, stale_until, self._sizeof(value))
+
+    def lookup(self, key):
+        """
+        Looks up a key, returning stale entries that are still inside their stale window.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            tuple | None: ``(value, is_stale)`` for a usable entry, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._load_from_store(key)
+            if entry is not None:
+                with self._lock:
+                    evicted = self._insert(key, entry)
+                self._delete_from_store(evicted)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.is_fresh(now):
+                self._stats["hits"] += 1
+                return entry.value, False
+            if entry.is_usable(now):
+                self._stats["stale_hits"] += 1
+                return entry.value, True
+            self._remove(key)
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+        self._delete_from_store([key])
+        return None
+
+    def get(self, key, default=None):
+        """
+        Returns the value for a key only if it is still fresh.
+
+        Args:
+            key (str): The cache key.
+            default: Value returned on a miss.
+
+        Returns:
+            The cached value, or ``default``.
+        """
+        found = self.lookup(key)
+        if found is None or found[1]:
+            return default
+        return found[0]
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores a value in the cache.
+
+        Args:
+            key (str): The cache key.
+            value: The value to cache.
+            ttl (float, optional): Seconds the entry stays fresh, defaults to the cache TTL.
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        entry = CacheEntry(value, now, expires_at, expires_at + self.stale_ttl, self._sizeof(value))
+        with self._lock:
+            evicted = self._insert(key, entry)
+        if self._store is not None:
+            self._store.save(key, entry)
+            self._delete_from_store(evicted)
+
+    def delete(self, key):
+        """
+        Removes a key from the cache and its backing store.
+
+        Args:
+            key (str): The cache key.
+        """
+        with self._lock:
+            self._remove(key)
+        self._delete_from_store([key])
+
+    def clear(self):
+        """
+        Removes every entry from the cache and its backing store.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._store is not None:
+            self._store.clear()
+
+    def age(self, key):
+        """
+        Returns the number of seconds since a key was last written.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            float | None: The age, or None when the key is not in memory.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else time.time() - entry.stored_at
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hit, stale hit, miss, eviction and expiration counts plus the current size.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+class SharedCache:
+    """
+    Cache shared by every worker process on a host, kept in an SQLite file in WAL mode.
+
+    It offers the interface of TTLCache, so the two are interchangeable, plus versioned reads
+    and an atomic compare-and-set for read-modify-write updates across processes. Several
+    caches can share one file, each under its own namespace with its own limits.
+
+    Values are pickled; the file is as trusted as the application database next to it. When
+    a write takes the namespace over its entry or byte limit, expired entries are dropped
+    first, then the entries closest to expiry, down to 90% of the limit. Reads never write,
+    so the eviction order is by expiry rather than by recent use.
+
+    Writes may wait up to the busy timeout for another process holding the write lock, so
+    ``set`` hands them to a background writer thread and returns at once: the value becomes
+    visible shortly after, and a write that still finds the file locked is dropped. Reads use
+    their own connection, which WAL mode never makes wait for a writer, so they are safe to call
+    from the event loop. ``compare_and_set``, ``delete`` and ``clear`` wait for their write;
+    async code should call them through ``asyncio.to_thread``.
+
+    Args:
+        path (str): The SQLite file, created if missing.
+        namespace (str): Name separating this cache from the others in the file.
+        max_entries (int): Maximum number of entries in the namespace.
+        max_bytes (int): Maximum total size of the pickled values in the namespace.
+        ttl (float): Default number of seconds an entry stays fresh.
+        stale_ttl (float): Number of seconds after expiry during which a stale entry may still be served.
+        busy_timeout_ms (int): How long a write waits for another process holding the write lock.
+    """
+
+    def __init__(self, path, namespace, max_entries=1024, max_bytes=16 * 1024 * 1024, ttl=300.0, stale_ttl=0.0, busy_timeout_ms=5000):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # Transactions are managed explicitly, so writes can take the lock with BEGIN IMMEDIATE
+        self._write_conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout_ms / 1000)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"shared-cache-{namespace}")
+        with self._transaction():
+            self._write_conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " stale_until REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._write_conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_shared_cache_expiry ON shared_cache (namespace, expires_at)"
+            )
+            # Running totals per namespace, so writes can check the limits without scanning
+            self._write_conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_cache_usage ("
+                " namespace TEXT PRIMARY KEY,"
+                " entries INTEGER NOT NULL,"
+                " bytes INTEGER NOT NULL)"
+            )
+            self._write_conn.execute(
+                "INSERT OR IGNORE INTO shared_cache_usage (namespace, entries, bytes) VALUES (?, 0, 0)", (namespace,)
+            )
+        # Reads get their own connection, so they never queue behind a write waiting for the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout_ms / 1000)
+        # Counters of this process; the entry and byte totals are shared
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "dropped_writes": 0}
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Runs the enclosed statements in one write transaction, holding the write lock from the start.
+        """
+        with self._write_lock:
+            self._write_conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._write_conn.execute("ROLLBACK")
+                raise
+            self._write_conn.execute("COMMIT")
+
+    def _read(self, key):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, version, stored_at, expires_at, stale_until FROM shared_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key)),
+            ).fetchone()
+
+    def lookup(self, key):
+        """
+        Looks up a key, returning stale entries that are still inside their stale window.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            tuple | None: ``(value, is_stale)`` for a usable entry, or None on a miss.
+        """
+        row = self._read(key)
+        now = time.time()
+        if row is None:
+            self._stats["misses"] += 1
+            return None
+        value, _, _, expires_at, stale_until = row
+        if now < expires_at:
+            self._stats["hits"] += 1
+            return pickle.loads(value), False
+        if now < stale_until:
+            self._stats["stale_hits"] += 1
+            return pickle.loads(value), True
+        self._stats["expirations"] += 1
+        self._stats["misses"] += 1
+        return None
+
+    def get(self, key, default=None):
+        """
+        Returns the value for a key only if it is still fresh.
+
+        Args:
+            key (str): The cache key.
+            default: Value returned on a miss.
+
+        Returns:
+            The cached value, or ``default``.
+        """
+        found = self.lookup(key)
+        if found is None or found[1]:
+            return default
+        return found[0]
+
+    def get_versioned(self, key):
+        """
+        Returns a fresh value together with its version, for a later ``compare_and_set``.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            tuple: ``(value, version)``, or ``(None, 0)`` when the key is missing or not fresh.
+        """
+        row = self._read(key)
+        if row is None or time.time() >= row[3]:
+            return None, 0
+        return pickle.loads(row[0]), row[1]
+
+    def age(self, key):
+        """
+        Returns the number of seconds since a key was last written.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            float | None: The age, or None when the key is missing.
+        """
+        row = self._read(key)
+        return None if row is None else time.time() - row[2]
+
+    def _write(self, key, value, ttl, expected_version, pickled=False):
+        key = str(key)
+        blob = value if pickled else pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._transaction():
+            row = self._write_conn.execute(
+                "SELECT version, size, expires_at FROM shared_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if expected_version is not None:
+                current = row[0] if row is not None and now < row[2] else 0
+                if current != expected_version:
+                    return False
+            version = (row[0] if row is not None else 0) + 1
+            self._write_conn.execute(
+                "INSERT OR REPLACE INTO shared_cache (namespace, key, value, size, version, stored_at, expires_at, stale_until)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, blob, len(blob), version, now, expires_at, expires_at + self.stale_ttl),
+            )
+            added, old_size = (1, 0) if row is None else (0, row[1])
+            self._write_conn.execute(
+                "UPDATE shared_cache_usage SET entries = entries + ?, bytes = bytes + ? WHERE namespace = ?",
+                (added, len(blob) - old_size, self.namespace),
+            )
+            self._evict_if_needed(now)
+        return True
+
+    def _evict_if_needed(self, now):
+        """
+        Brings the namespace back under its limits. Runs inside the write transaction.
+        """
+        entries, size = self._write_conn.execute(
+            "SELECT entries, bytes FROM shared_cache_usage WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        expired = self._write_conn.execute(
+            "DELETE FROM shared_cache WHERE namespace = ? AND stale_until <= ?", (self.namespace, now)
+        ).rowcount
+        self._stats["expirations"] += expired
+        entries, size = self._write_conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM shared_cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        # Evict down to 90% of the limits, so the next writes do not all pay for an eviction
+        target_entries, target_bytes = int(self.max_entries * 0.9), int(self.max_bytes * 0.9)
+        if entries > self.max_entries or size > self.max_bytes:
+            victims = []
+            for key, victim_size in self._write_conn.execute(
+                "SELECT key, size FROM shared_cache WHERE namespace = ? ORDER BY expires_at", (self.namespace,)
+            ):
+                if entries <= max(1, target_entries) and size <= target_bytes:
+                    break
+                victims.append((self.namespace, key))
+                entries -= 1
+                size -= victim_size
+            self._write_conn.executemany("DELETE FROM shared_cache WHERE namespace = ? AND key = ?", victims)
+            self._stats["evictions"] += len(victims)
+        self._write_conn.execute(
+            "UPDATE shared_cache_usage SET entries = ?, bytes = ? WHERE namespace = ?", (entries, size, self.namespace)
+        )
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores a value in the cache, in the background.
+
+        The value is pickled right away, so later changes to it are not stored, then written by
+        the writer thread; the call returns without waiting for the write lock.
+
+        Args:
+            key (str): The cache key.
+            value: The value to cache; it must be picklable.
+            ttl (float, optional): Seconds the entry stays fresh, defaults to the cache TTL.
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._writer.submit(self._write_in_background, key, blob, ttl)
+
+    def _write_in_background(self, key, blob, ttl):
+        try:
+            self._write(key, blob, ttl, expected_version=None, pickled=True)
+        except sqlite3.OperationalError as e:
+            # Still locked after the busy timeout; a cache write is not worth retrying
+            self._stats["dropped_writes"] += 1
+            logger.warning("Dropped a write to the %s shared cache: %s", self.namespace, e)
+
+    def compare_and_set(self, key, value, version, ttl=None):
+        """
+        Stores a value only if the key still has the given version, atomically across processes.
+
+        Args:
+            key (str): The cache key.
+            value: The new value.
+            version (int): The version returned by ``get_versioned``; 0 expects the key to be missing or expired.
+            ttl (float, optional): Seconds the entry stays fresh, defaults to the cache TTL.
+
+        Returns:
+            bool: True if the value was stored, False if another write came first.
+        """
+        return self._write(key, value, ttl, expected_version=version)
+
+    def delete(self, key):
+        """
+        Removes a key from the cache.
+
+        Args:
+            key (str): The cache key.
+        """
+        with self._transaction():
+            row = self._write_conn.execute(
+                "SELECT size FROM shared_cache WHERE namespace = ? AND key = ?", (self.namespace, str(key))
+            ).fetchone()
+            if row is None:
+                return
+            self._write_conn.execute("DELETE FROM shared_cache WHERE namespace = ? AND key = ?", (self.namespace, str(key)))
+            self._write_conn.execute(
+                "UPDATE shared_cache_usage SET entries = entries - 1, bytes = bytes - ? WHERE namespace = ?",
+                (row[0], self.namespace),
+            )
+
+    def clear(self):
+        """
+        Removes every entry of the namespace.
+        """
+        with self._transaction():
+            self._write_conn.execute("DELETE FROM shared_cache WHERE namespace = ?", (self.namespace,))
+            self._write_conn.execute("UPDATE shared_cache_usage SET entries = 0, bytes = 0 WHERE namespace = ?", (self.namespace,))
+
+    def _usage(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT entries, bytes FROM shared_cache_usage WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+
+    def __len__(self):
+        return self._usage()[0]
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hit, stale hit, miss, eviction and expiration counts of this process, plus the shared size.
+        """
+        stats = dict(self._stats)
+        stats["entries"], stats["bytes"] = self._usage()
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
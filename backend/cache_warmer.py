@@ -0,0 +1,110 @@
+"""
+This module keeps the search cache warm for the queries every user starts with.
+
+The UI offers a fixed set of genres, so their search results are fetched on startup and
+refreshed in the background before they go stale; browsing them never waits on Google Books.
+Each refresh is scheduled a random jitter away from the nominal interval, so several workers
+started together do not hit the upstream API at the same moment.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Delay before retrying a query whose refresh failed
+RETRY_SECONDS = 30.0
+
+
+class CacheWarmer:
+    """
+    Periodically refreshes a fixed list of queries through a refresh function.
+
+    Args:
+        queries (list): The queries to keep warm.
+        refresh: Coroutine function fetching one query and storing it in the cache. Returns the number of results.
+        interval (float): Seconds between two refreshes of the same query.
+        jitter (float): Maximum random offset, in seconds, added to every scheduled refresh.
+    """
+
+    def __init__(self, queries, refresh, interval: float, jitter: float):
+        self.queries = list(dict.fromkeys(queries))
+        self.refresh = refresh
+        self.interval = interval
+        self.jitter = jitter
+        self._status = {query: {"last_refreshed": None, "results": None, "last_error": None} for query in self.queries}
+        self._due = {}  # query -> monotonic time of its next refresh
+        self._task = None
+
+    def _schedule(self, query: str, delay: float):
+        self._due[query] = time.monotonic() + delay + random.uniform(0, self.jitter)
+
+    async def warm(self, query: str):
+        """
+        Refreshes one query now and records the outcome.
+
+        Args:
+            query (str): The query to refresh.
+
+        Returns:
+            bool: Whether the refresh succeeded.
+        """
+        status = self._status[query]
+        try:
+            status["results"] = await self.refresh(query)
+        except Exception as e:
+            status["last_error"] = getattr(e, "detail", None) or repr(e)
+            logger.warning("Warming the search cache for %r failed: %s", query, status["last_error"])
+            return False
+        status["last_refreshed"] = datetime.utcnow()
+        status["last_error"] = None
+        return True
+
+    async def _run(self):
+        # The first round is only jittered, so caches are warm shortly after startup
+        for query in self.queries:
+            self._schedule(query, 0)
+        while True:
+            query = min(self._due, key=self._due.get)
+            await asyncio.sleep(max(self._due[query] - time.monotonic(), 0))
+            succeeded = await self.warm(query)
+            self._schedule(query, self.interval if succeeded else min(RETRY_SECONDS, self.interval))
+
+    def status(self):
+        """
+        Returns when each query was last refreshed and when it is refreshed next.
+
+        Returns:
+            list: One entry per query with its last refresh time, result count, last error and seconds until the next refresh.
+        """
+        now = time.monotonic()
+        return [
+            dict(
+                self._status[query],
+                query=query,
+                next_refresh_in=round(max(self._due[query] - now, 0), 1) if query in self._due else None,
+            )
+            for query in self.queries
+        ]
+
+    def start(self):
+        """
+        Starts the background refresh task. Called from the FastAPI startup event.
+        """
+        if self.queries and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the background refresh task. Called from the FastAPI shutdown event.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
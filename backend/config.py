@@ -0,0 +1,140 @@
+"""
+This module holds the runtime settings of the self-learning application backend.
+
+Every setting has a default that works for local development and can be overridden
+with an environment variable of the same name in upper case (for example
+``SEARCH_CACHE_TTL_SECONDS=600``).
+"""
+
+import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Settings used by the backend modules.
+    """
+
+    # Database
+    database_url: str = "sqlite:///./self_learning_app.db"
+    database_read_url: str = ""  # Empty sends reads to DATABASE_URL
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout_seconds: float = 30.0
+    database_pool_recycle_seconds: int = 1800
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_temp_store: str = "MEMORY"
+
+    # Google Books search result cache
+    search_cache_max_entries: int = 1024
+    search_cache_max_bytes: int = 16 * 1024 * 1024
+    search_cache_ttl_seconds: float = 300.0
+    search_cache_stale_seconds: float = 3600.0
+    search_cache_path: str = ""  # Empty disables the on-disk backing store
+
+    # Google Books single-volume cache
+    volume_cache_max_entries: int = 4096
+    volume_cache_max_bytes: int = 16 * 1024 * 1024
+    volume_cache_ttl_seconds: float = 86400.0
+
+    # Cache shared by the worker processes of a host, for search results, volumes and principals
+    shared_cache_path: str = ""  # Empty keeps those caches per process, e.g. ./self_learning_app.cache.db shares them
+
+    # Google Books API, and the deadline, circuit breaker and hedging of calls to it
+    google_books_api_url: str = "https://www.googleapis.com/books/v1/volumes"
+    upstream_deadline_seconds: float = 3.0
+    upstream_slow_call_seconds: float = 2.0
+    upstream_breaker_failure_ratio: float = 0.5
+    upstream_breaker_window: int = 20
+    upstream_breaker_min_calls: int = 10
+    upstream_breaker_open_seconds: float = 30.0
+    upstream_hedge: bool = False
+    upstream_hedge_min_delay_seconds: float = 0.05
+
+    # Shared upstream HTTP client
+    upstream_max_connections: int = 100
+    upstream_max_keepalive_connections: int = 20
+    upstream_keepalive_expiry_seconds: float = 30.0
+    upstream_connect_timeout_seconds: float = 5.0
+    upstream_read_timeout_seconds: float = 10.0
+    upstream_pool_timeout_seconds: float = 5.0
+
+    # Password hashing
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+
+    # Authenticated principal cache
+    principal_cache_max_entries: int = 10000
+    principal_cache_ttl_seconds: float = 300.0
+
+    # Write-behind buffering of reading progress
+    progress_write_behind: bool = False
+    progress_flush_interval_seconds: float = 5.0
+    progress_flush_max_pending: int = 1000
+
+    # HTTP caching and compression
+    search_max_age_seconds: int = 60  # How long clients may reuse search results without revalidating
+    compression_minimum_bytes: int = 1024
+
+    # Background warming of hot search queries
+    cache_warm_queries: str = "Science Fiction,Mystery,Fantasy,Non-fiction"  # Comma-separated, empty disables warming
+    cache_warm_interval_seconds: float = 240.0  # Below SEARCH_CACHE_TTL_SECONDS keeps the entries fresh
+    cache_warm_jitter_seconds: float = 30.0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds the settings from environment variables, falling back to the defaults.
+
+        Returns:
+            Settings: The settings for this process.
+        """
+        values = {}
+        for setting in fields(cls):
+            raw = os.environ.get(setting.name.upper())
+            if raw is None:
+                continue
+            if isinstance(setting.default, bool):
+                values[setting.name] = raw.strip().lower() in _TRUE_VALUES
+            else:
+                values[setting.name] = type(setting.default)(raw)
+        return cls(**values)
+
+
+# Settings given to use_settings, taking precedence over the environment
+_configured = None
+
+
+@lru_cache(maxsize=1)
+def get_settings():
+    """
+    Returns the process-wide settings, read from the environment on first use.
+
+    Returns:
+        Settings: The application settings.
+    """
+    return _configured if _configured is not None else Settings.from_env()
+
+
+def use_settings(settings: Settings):
+    """
+    Replaces the process-wide settings.
+
+    Modules read the settings when they are imported, so this only affects modules imported
+    afterwards; ``create_app`` calls it before loading any of them.
+
+    Args:
+        settings (Settings): The settings to use.
+    """
+    global _configured
+    _configured = settings
+    get_settings.cache_clear()
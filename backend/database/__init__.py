@@ -1,22 +1,37 @@
 """
 This module initializes the database connection for the self-learning application.
-It sets up the SQLite database using SQLAlchemy and provides session management functions.
+It sets up the database engines using SQLAlchemy and provides session management functions.
+The database URL, pool sizes and SQLite pragmas are taken from the application settings.
+Request handlers use the asyncio sessions (``get_async_db``); the synchronous sessions remain
+for startup tasks and scripts. This is the only place engines and the declarative ``Base`` are
+created, so every module shares one connection pool per database and one metadata.
 
 All functions follow PEP8 style guidelines and ensure proper handling of database connections.
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# SQLite database URL (change this if using a different database)
-SQLALCHEMY_DATABASE_URL = "sqlite:///./self_learning_app.db"
+from ..config import get_settings
+from .engine import create_app_engine, create_async_app_engine, create_async_read_engine, create_read_engine
 
-# SQLAlchemy database engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Database URL (set DATABASE_URL to use a different database)
+SQLALCHEMY_DATABASE_URL = get_settings().database_url
 
-# Create a session local class to interact with the database
+# SQLAlchemy database engines, one for writes and one for read-only request handlers
+engine = create_app_engine(SQLALCHEMY_DATABASE_URL)
+read_engine = create_read_engine(engine)
+
+# Create session local classes to interact with the database
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# asyncio engines and sessions used by the request handlers
+async_engine = create_async_app_engine(SQLALCHEMY_DATABASE_URL)
+async_read_engine = create_async_read_engine(async_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 # Base class to define database models
 Base = declarative_base()
@@ -34,10 +49,51 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """
+    Provides a new read-only database session for each request. Use it in handlers that never write.
+
+    Yields:
+        Session: A SQLAlchemy session bound to the read engine.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """
+    Provides a new asyncio database session for each request.
+
+    Yields:
+        AsyncSession: A SQLAlchemy asyncio session that can be used for database interactions.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """
+    Provides a new read-only asyncio database session for each request. Use it in handlers that never write.
+
+    Yields:
+        AsyncSession: A SQLAlchemy asyncio session bound to the read engine.
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+async def dispose_engines():
+    """
+    Closes the pooled asyncio connections. Called from the FastAPI shutdown event.
+    """
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
 def init_db():
     """
-    Initializes the database by creating tables if they do not exist.
-    Calls the metadata create_all method to apply the table schemas.
+    Initializes the database by applying any pending schema migrations.
+    New databases get every table; existing databases are upgraded in place.
     """
-    from .models import User, Book  # Importing models here to avoid circular imports
-    Base.metadata.create_all(bind=engine)
+    from .migrations import run_migrations  # Imported here to avoid circular imports
+    run_migrations(engine)
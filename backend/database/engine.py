@@ -0,0 +1,264 @@
+"""
+This module builds the SQLAlchemy engines used by the self-learning application.
+
+The database URL and pool sizes come from the application settings, so the same code runs
+against the local SQLite file or a server database such as PostgreSQL. For SQLite every new
+connection is tuned with pragmas (WAL journal, relaxed fsync, larger page cache, memory-mapped
+I/O and a busy timeout) so that several workers can read and write concurrently without
+"database is locked" errors.
+"""
+
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from ..config import get_settings
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+# asyncio drivers used when a URL names a backend without a driver
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def _choice(value: str, allowed: set, name: str):
+    """
+    Validates a pragma value taken from the settings.
+
+    Args:
+        value (str): The configured value.
+        allowed (set): The accepted values, in upper case.
+        name (str): The setting name, used in the error message.
+
+    Returns:
+        str: The value in upper case.
+    """
+    value = value.upper()
+    if value not in allowed:
+        raise ValueError(f"Invalid {name}: {value!r}, expected one of {sorted(allowed)}")
+    return value
+
+
+def is_memory_database(url):
+    """
+    Tells whether a SQLite URL points to an in-memory database.
+
+    Args:
+        url (URL): The parsed database URL.
+
+    Returns:
+        bool: True for in-memory SQLite databases, including the shared ones from ``shared_memory_url``.
+    """
+    return url.get_backend_name() == "sqlite" and (url.database in (None, "", ":memory:") or url.query.get("mode") == "memory")
+
+
+def shared_memory_url(url):
+    """
+    Rewrites an in-memory SQLite URL into a named in-memory database shared by every engine of the process.
+
+    Each ``:memory:`` connection opens its own empty database, so the synchronous engine migrated
+    by ``init_db`` and the asyncio engine serving requests would not see the same tables. A named
+    database in shared-cache mode is one database for every connection of the process, kept
+    alive by the connections the engines hold in their static pools.
+
+    Args:
+        url (URL): A parsed in-memory SQLite URL.
+
+    Returns:
+        URL: The URL of the shared in-memory database, keeping the driver.
+    """
+    if url.query.get("mode") == "memory":
+        return url
+    return url.set(
+        database=f"file:self_learning_app_{os.getpid()}",
+        query={"mode": "memory", "cache": "shared", "uri": "true"},
+    )
+
+
+def sqlite_pragmas(read_only: bool = False, memory: bool = False):
+    """
+    Returns the pragma statements applied to every new SQLite connection.
+
+    Args:
+        read_only (bool): Whether the connection is only used for reads.
+        memory (bool): Whether the database lives in memory, where WAL and mmap do not apply.
+
+    Returns:
+        list: The ``PRAGMA`` statements, in the order they must run.
+    """
+    settings = get_settings()
+    pragmas = [f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}"]
+    if not memory:
+        pragmas.append(f"PRAGMA journal_mode = {_choice(settings.sqlite_journal_mode, _JOURNAL_MODES, 'SQLITE_JOURNAL_MODE')}")
+        pragmas.append(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size_bytes)}")
+    pragmas += [
+        f"PRAGMA synchronous = {_choice(settings.sqlite_synchronous, _SYNCHRONOUS_MODES, 'SQLITE_SYNCHRONOUS')}",
+        # A negative cache_size is a size in KiB rather than a number of pages
+        f"PRAGMA cache_size = {-int(settings.sqlite_cache_size_kib)}",
+        f"PRAGMA temp_store = {_choice(settings.sqlite_temp_store, _TEMP_STORES, 'SQLITE_TEMP_STORE')}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def create_app_engine(url: str = None, read_only: bool = False):
+    """
+    Creates an engine for the configured database with tuned pooling and, on SQLite, pragmas.
+
+    Args:
+        url (str, optional): The database URL, defaults to the ``DATABASE_URL`` setting.
+        read_only (bool): Whether the engine only serves reads.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
+    """
+    settings = get_settings()
+    url = make_url(url or settings.database_url)
+    options = {"pool_pre_ping": True}
+
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout_seconds,
+            pool_recycle=settings.database_pool_recycle_seconds,
+        )
+        return create_engine(url, **options)
+
+    memory = is_memory_database(url)
+    options["connect_args"] = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000}
+    if memory:
+        # Every connection to ":memory:" would open its own empty database, so share one
+        url = shared_memory_url(url)
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            poolclass=QueuePool,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout_seconds,
+        )
+    engine = create_engine(url, **options)
+    _listen_for_pragmas(engine, sqlite_pragmas(read_only=read_only, memory=memory))
+    return engine
+
+
+def _listen_for_pragmas(engine, pragmas: list):
+    """
+    Runs the given pragmas on every new DBAPI connection of an engine.
+
+    Args:
+        engine (Engine): A synchronous engine, or the ``sync_engine`` of an async one.
+        pragmas (list): The ``PRAGMA`` statements to run.
+    """
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def async_url(url: str):
+    """
+    Returns the asyncio variant of a database URL, e.g. ``sqlite+aiosqlite`` for ``sqlite``.
+
+    URLs that already name a driver are returned unchanged.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        URL: The parsed URL using an asyncio driver.
+    """
+    url = make_url(url)
+    if "+" in url.drivername:
+        return url
+    return url.set(drivername=f"{url.drivername}+{_ASYNC_DRIVERS.get(url.drivername, url.drivername)}")
+
+
+def create_async_app_engine(url: str = None, read_only: bool = False):
+    """
+    Creates an asyncio engine with the same pooling and SQLite pragmas as ``create_app_engine``.
+
+    Args:
+        url (str, optional): The database URL, defaults to the ``DATABASE_URL`` setting.
+        read_only (bool): Whether the engine only serves reads.
+
+    Returns:
+        AsyncEngine: The SQLAlchemy asyncio engine.
+    """
+    settings = get_settings()
+    url = async_url(url or settings.database_url)
+    options = {"pool_pre_ping": True}
+
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout_seconds,
+            pool_recycle=settings.database_pool_recycle_seconds,
+        )
+        return create_async_engine(url, **options)
+
+    memory = is_memory_database(url)
+    options["connect_args"] = {"timeout": settings.sqlite_busy_timeout_ms / 1000}
+    if memory:
+        url = shared_memory_url(url)
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout_seconds,
+        )
+    engine = create_async_engine(url, **options)
+    _listen_for_pragmas(engine.sync_engine, sqlite_pragmas(read_only=read_only, memory=memory))
+    return engine
+
+
+def create_async_read_engine(write_engine):
+    """
+    Creates the asyncio engine used by read-only request handlers, following ``create_read_engine``.
+
+    Args:
+        write_engine (AsyncEngine): The asyncio engine used for writes.
+
+    Returns:
+        AsyncEngine: The asyncio engine for read-only sessions.
+    """
+    settings = get_settings()
+    if settings.database_read_url:
+        return create_async_app_engine(settings.database_read_url, read_only=True)
+    if write_engine.dialect.name != "sqlite" or is_memory_database(write_engine.url):
+        return write_engine
+    return create_async_app_engine(write_engine.url.render_as_string(hide_password=False), read_only=True)
+
+
+def create_read_engine(write_engine):
+    """
+    Creates the engine used by read-only request handlers.
+
+    Reads go to ``DATABASE_READ_URL`` when it is set (e.g. a replica). On a SQLite file a second
+    pool of read-only connections is opened, which WAL lets run alongside the writer. In-memory
+    databases cannot be shared that way, so the write engine is reused.
+
+    Args:
+        write_engine (Engine): The engine used for writes.
+
+    Returns:
+        Engine: The engine for read-only sessions.
+    """
+    settings = get_settings()
+    if settings.database_read_url:
+        return create_app_engine(settings.database_read_url, read_only=True)
+    if write_engine.dialect.name != "sqlite" or is_memory_database(write_engine.url):
+        return write_engine
+    return create_app_engine(write_engine.url.render_as_string(hide_password=False), read_only=True)
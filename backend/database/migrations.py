@@ -0,0 +1,342 @@
+"""
+This module applies versioned schema migrations to the self-learning application database.
+
+Each migration has a version number, a short description and a function that receives an open
+connection. Applied versions are recorded in the ``schema_migrations`` table, so an existing
+database only runs the migrations it has not seen yet and a new database runs all of them.
+Every migration runs in its own transaction.
+
+Migrations run automatically on startup through ``init_db`` and can be run by hand:
+
+    python -m backend.database.migrations upgrade
+    python -m backend.database.migrations status
+
+The migrations are written for SQLite and PostgreSQL only: the shipped ones create VARCHAR
+columns without a length and change column types with PostgreSQL's ``ALTER COLUMN ... TYPE``.
+``run_migrations`` refuses other databases rather than leaving them half migrated.
+
+To change the schema, append a new migration to ``MIGRATIONS`` and update the models to match.
+Never edit a migration that has already shipped.
+"""
+
+import argparse
+from datetime import datetime
+
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+MIGRATIONS = []
+
+# Databases the migrations can be applied to, by SQLAlchemy dialect name
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+
+
+class _AlreadyApplied(Exception):
+    """
+    Raised when another process applied a migration between the version check and the claim.
+    """
+
+
+def migration(version: int, description: str):
+    """
+    Registers a function as the migration with the given version.
+
+    Args:
+        version (int): The schema version the migration upgrades to. Versions must increase by one.
+        description (str): What the migration changes.
+
+    Returns:
+        callable: The decorator.
+    """
+    def register(function):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] == version - 1, "Migration versions must be consecutive"
+        MIGRATIONS.append((version, description, function))
+        return function
+    return register
+
+
+@migration(1, "Create the users and books tables")
+def _create_base_tables(conn):
+    # The schema as originally created by Base.metadata.create_all
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("username", String, unique=True, index=True, nullable=False),
+        Column("password_hash", String, nullable=False),
+        Column("email", String, unique=True, nullable=True),
+        Column("created_at", String, nullable=False),
+    )
+    Table(
+        "books", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("title", String, nullable=False),
+        Column("author", String, nullable=True),
+        Column("description", String, nullable=True),
+        Column("user_id", Integer, nullable=False),
+        Column("pages_read", Integer),
+        Column("is_favorite", Integer),
+    )
+    metadata.create_all(conn, checkfirst=True)
+
+
+@migration(2, "Index books by user and by (user, favorite)")
+def _index_books_by_user(conn):
+    books = Table("books", MetaData(), Column("user_id", Integer), Column("is_favorite", Integer))
+    Index("ix_books_user_id", books.c.user_id).create(conn, checkfirst=True)
+    Index("ix_books_user_id_is_favorite", books.c.user_id, books.c.is_favorite).create(conn, checkfirst=True)
+
+
+@migration(3, "Store users.created_at as a timestamp and books.is_favorite as a boolean")
+def _use_native_column_types(conn):
+    if conn.dialect.name != "sqlite":
+        conn.execute(text(
+            "ALTER TABLE users ALTER COLUMN created_at TYPE TIMESTAMP USING created_at::timestamp"
+        ))
+        conn.execute(text(
+            "ALTER TABLE books ALTER COLUMN is_favorite TYPE BOOLEAN USING COALESCE(is_favorite, 0) <> 0"
+        ))
+        conn.execute(text("ALTER TABLE books ALTER COLUMN is_favorite SET DEFAULT FALSE"))
+        conn.execute(text("UPDATE books SET pages_read = 0 WHERE pages_read IS NULL"))
+        return
+
+    # SQLite cannot change column types in place, so both tables are rebuilt and copied
+    conn.execute(text(
+        """
+        CREATE TABLE users_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            username VARCHAR NOT NULL,
+            password_hash VARCHAR NOT NULL,
+            email VARCHAR UNIQUE,
+            created_at DATETIME NOT NULL
+        )
+        """
+    ))
+    # Unparseable legacy dates fall back to the migration time rather than failing the copy
+    conn.execute(text(
+        """
+        INSERT INTO users_new (id, username, password_hash, email, created_at)
+        SELECT id, username, password_hash, email, COALESCE(datetime(created_at), datetime('now'))
+        FROM users
+        """
+    ))
+    conn.execute(text("DROP TABLE users"))
+    conn.execute(text("ALTER TABLE users_new RENAME TO users"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_users_username ON users (username)"))
+
+    conn.execute(text(
+        """
+        CREATE TABLE books_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            title VARCHAR NOT NULL,
+            author VARCHAR,
+            description VARCHAR,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            pages_read INTEGER NOT NULL DEFAULT 0,
+            is_favorite BOOLEAN NOT NULL DEFAULT 0 CHECK (is_favorite IN (0, 1))
+        )
+        """
+    ))
+    conn.execute(text(
+        """
+        INSERT INTO books_new (id, title, author, description, user_id, pages_read, is_favorite)
+        SELECT id, title, author, description, user_id,
+               COALESCE(pages_read, 0), CASE WHEN is_favorite THEN 1 ELSE 0 END
+        FROM books
+        """
+    ))
+    conn.execute(text("DROP TABLE books"))
+    conn.execute(text("ALTER TABLE books_new RENAME TO books"))
+    conn.execute(text("CREATE INDEX ix_books_user_id ON books (user_id)"))
+    conn.execute(text("CREATE INDEX ix_books_user_id_is_favorite ON books (user_id, is_favorite)"))
+
+
+@migration(4, "Create the full-text search index over books")
+def _create_search_index(conn):
+    if conn.dialect.name != "sqlite":
+        return  # The search index relies on SQLite FTS5
+    conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS search_documents (
+            rowid INTEGER PRIMARY KEY,
+            doc_key TEXT NOT NULL UNIQUE,
+            volume_id TEXT,
+            title TEXT NOT NULL,
+            author TEXT,
+            description TEXT
+        )
+        """
+    ))
+    conn.execute(text(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5(
+            title, author, description,
+            content='search_documents', content_rowid='rowid',
+            tokenize='porter unicode61'
+        )
+        """
+    ))
+    conn.execute(text(
+        """
+        CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+            INSERT INTO search_documents_fts (rowid, title, author, description)
+            VALUES (new.rowid, new.title, new.author, new.description);
+        END
+        """
+    ))
+    conn.execute(text(
+        """
+        CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+            INSERT INTO search_documents_fts (search_documents_fts, rowid, title, author, description)
+            VALUES ('delete', old.rowid, old.title, old.author, old.description);
+        END
+        """
+    ))
+    conn.execute(text(
+        """
+        CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+            INSERT INTO search_documents_fts (search_documents_fts, rowid, title, author, description)
+            VALUES ('delete', old.rowid, old.title, old.author, old.description);
+            INSERT INTO search_documents_fts (rowid, title, author, description)
+            VALUES (new.rowid, new.title, new.author, new.description);
+        END
+        """
+    ))
+    # Books saved before the index existed have no volume ID, key them by their row ID
+    conn.execute(text(
+        """
+        INSERT OR IGNORE INTO search_documents (doc_key, volume_id, title, author, description)
+        SELECT 'book:' || id, NULL, title, author, description FROM books
+        """
+    ))
+
+
+@migration(5, "Create the reading event log and its per-user and per-day rollups")
+def _create_reading_stats_tables(conn):
+    metadata = MetaData()
+    Table(
+        "reading_events", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("book_id", Integer, ForeignKey("books.id"), nullable=False),
+        Column("pages_read", Integer, nullable=False),
+        Column("pages_delta", Integer, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Index("ix_reading_events_user_id_created_at", "user_id", "created_at"),
+    )
+    Table(
+        "user_reading_stats", metadata,
+        Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("total_pages", Integer, nullable=False),
+        Column("progress_updates", Integer, nullable=False),
+        Column("days_read", Integer, nullable=False),
+        Column("current_streak", Integer, nullable=False),
+        Column("longest_streak", Integer, nullable=False),
+        Column("last_read_on", Date, nullable=True),
+    )
+    Table(
+        "daily_reading_stats", metadata,
+        Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("day", Date, primary_key=True),
+        Column("pages", Integer, nullable=False),
+        Column("progress_updates", Integer, nullable=False),
+    )
+    # The referenced tables are only needed to resolve the foreign keys
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    Table("books", metadata, Column("id", Integer, primary_key=True))
+    metadata.create_all(conn, tables=[
+        metadata.tables["reading_events"],
+        metadata.tables["user_reading_stats"],
+        metadata.tables["daily_reading_stats"],
+    ])
+
+
+@migration(6, "Add users.library_version, bumped whenever a user's books change")
+def _add_library_version(conn):
+    conn.execute(text("ALTER TABLE users ADD COLUMN library_version INTEGER NOT NULL DEFAULT 0"))
+
+
+_schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions(engine):
+    """
+    Returns the migration versions already applied to a database.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        set: The applied versions.
+    """
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("schema_migrations"):
+            return set()
+        return set(conn.execute(_schema_migrations.select().with_only_columns(_schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine):
+    """
+    Applies every pending migration, in version order.
+
+    Each migration first claims its version in ``schema_migrations`` inside its own transaction,
+    so when several workers start at once only one of them applies it.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        list: The versions applied by this call.
+
+    Raises:
+        RuntimeError: If the database is not one of ``SUPPORTED_DIALECTS``.
+    """
+    if engine.dialect.name not in SUPPORTED_DIALECTS:
+        raise RuntimeError(
+            f"Schema migrations support {' and '.join(SUPPORTED_DIALECTS)} only, not {engine.dialect.name}."
+        )
+    _schema_migrations.create(engine, checkfirst=True)
+    done = applied_versions(engine)
+    applied = []
+    for version, description, function in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            with engine.begin() as conn:
+                try:
+                    conn.execute(_schema_migrations.insert().values(
+                        version=version, description=description, applied_at=datetime.utcnow()
+                    ))
+                except IntegrityError:
+                    raise _AlreadyApplied()
+                function(conn)
+        except _AlreadyApplied:
+            continue  # Another worker applied this migration first
+        applied.append(version)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the self-learning application database schema.")
+    parser.add_argument("command", choices=["upgrade", "status"], help="apply pending migrations, or list them")
+    args = parser.parse_args()
+
+    from . import engine
+
+    if args.command == "upgrade":
+        applied = run_migrations(engine)
+        print(f"Applied migrations: {applied}" if applied else "Database schema is up to date.")
+        return
+
+    done = applied_versions(engine)
+    for version, description, _ in MIGRATIONS:
+        print(f"{version:>4}  {'applied' if version in done else 'pending'}  {description}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
-from .database import Base  # Import the Base from database
+from . import Base  # The declarative base shared by every model
 
 class User(Base):
     """
@@ -8,11 +10,13 @@ class User(Base):
     """
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=True)
-    created_at = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped by every change to the user's books; /books/my_books derives its ETag from it
+    library_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationship to the books owned by the user
     books = relationship("Book", back_populates="owner")
@@ -21,16 +25,65 @@ class User(Base):
 class Book(Base):
     """
     Book model representing books that belong to users.
+
+    The schema is managed by ``backend.database.migrations``; keep both in sync.
     """
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_user_id_is_favorite", "user_id", "is_favorite"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     author = Column(String, nullable=True)
     description = Column(String, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    pages_read = Column(Integer, default=0)
-    is_favorite = Column(Integer, default=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    pages_read = Column(Integer, nullable=False, default=0)
+    is_favorite = Column(Boolean, nullable=False, default=False)
 
     # Relationship to the user who owns this book
     owner = relationship("User", back_populates="books")
+
+
+class ReadingEvent(Base):
+    """
+    Append-only log entry written each time a user reports reading progress on a book.
+    """
+    __tablename__ = "reading_events"
+    __table_args__ = (
+        Index("ix_reading_events_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    pages_read = Column(Integer, nullable=False)
+    pages_delta = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class UserReadingStats(Base):
+    """
+    Running reading totals of a user, updated together with every reading event.
+    """
+    __tablename__ = "user_reading_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_pages = Column(Integer, nullable=False, default=0)
+    progress_updates = Column(Integer, nullable=False, default=0)
+    days_read = Column(Integer, nullable=False, default=0)
+    current_streak = Column(Integer, nullable=False, default=0)
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_read_on = Column(Date, nullable=True)
+
+
+class DailyReadingStats(Base):
+    """
+    Pages read and progress updates of a user on one (UTC) day, updated together with every reading event.
+    """
+    __tablename__ = "daily_reading_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    pages = Column(Integer, nullable=False, default=0)
+    progress_updates = Column(Integer, nullable=False, default=0)
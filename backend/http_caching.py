@@ -0,0 +1,76 @@
+"""
+This module provides the helpers for HTTP conditional requests.
+
+Routes derive a strong ETag from whatever versions the response depends on, compare it with
+the client's ``If-None-Match`` header, and answer ``304 Not Modified`` without building the
+response body when the client already holds the current version.
+"""
+
+import hashlib
+
+from fastapi import Response
+
+from .responses import dumps
+
+# Book lists are per user and must be revalidated on every use
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts):
+    """
+    Builds a strong ETag from the values a response depends on.
+
+    Args:
+        *parts: Values identifying the response version, e.g. a version counter and the query parameters.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def content_etag(content):
+    """
+    Builds a strong ETag from the JSON encoding of a response body.
+
+    Args:
+        content: The JSON-compatible response content.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    return f'"{hashlib.blake2b(dumps(content), digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag: str):
+    """
+    Tells whether an ``If-None-Match`` header matches an ETag, using the weak comparison of RFC 9110.
+
+    Args:
+        if_none_match (str, optional): The header value sent by the client.
+        etag (str): The current ETag of the resource.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str, cache_control: str):
+    """
+    Builds the ``304 Not Modified`` response for a resource.
+
+    Args:
+        etag (str): The current ETag.
+        cache_control (str): The Cache-Control header of the resource.
+
+    Returns:
+        Response: The empty 304 response.
+    """
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
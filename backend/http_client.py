@@ -0,0 +1,64 @@
+"""
+This module owns the shared asynchronous HTTP client used for upstream calls such as the Google Books API.
+
+A single client keeps a pool of keep-alive connections, so repeated upstream requests reuse
+existing TCP and TLS sessions instead of opening a new connection per call. The client is
+opened on application startup and closed on shutdown.
+"""
+
+import httpx
+
+from .config import get_settings
+
+_client = None
+
+
+def _build_client():
+    """
+    Creates the pooled HTTP client from the configured limits and timeouts.
+
+    Returns:
+        httpx.AsyncClient: A new asynchronous HTTP client.
+    """
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.upstream_max_connections,
+        max_keepalive_connections=settings.upstream_max_keepalive_connections,
+        keepalive_expiry=settings.upstream_keepalive_expiry_seconds,
+    )
+    timeout = httpx.Timeout(
+        settings.upstream_read_timeout_seconds,
+        connect=settings.upstream_connect_timeout_seconds,
+        pool=settings.upstream_pool_timeout_seconds,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def get_http_client():
+    """
+    Returns the shared HTTP client, creating it on first use if startup has not done so.
+
+    Returns:
+        httpx.AsyncClient: The shared asynchronous HTTP client.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def start_http_client():
+    """
+    Opens the shared HTTP client. Called from the FastAPI startup event.
+    """
+    get_http_client()
+
+
+async def close_http_client():
+    """
+    Closes the shared HTTP client and its pooled connections. Called from the FastAPI shutdown event.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,402 @@
+"""
+This module collects runtime metrics and serves them in the Prometheus text format at ``/metrics``.
+
+It records:
+
+- per-route request latency histograms and in-flight request gauges, from ``MetricsMiddleware``;
+- SQL query counts and durations, from SQLAlchemy engine events, also summed per request so
+  routes issuing many queries stand out;
+- upstream call latencies, reported with ``observe_upstream``;
+- cache hit ratios and other component counters, read from registered collectors at scrape time.
+
+Recording a sample is a dictionary lookup and a few additions under a lock, cheap enough to
+leave enabled permanently.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency buckets, in seconds, shared by the request, query and upstream histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Base class of the metric types: a name, help text, label names and samples per label values.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down.
+    """
+
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """
+    Counts observations in cumulative buckets and tracks their sum.
+
+    Args:
+        buckets (tuple): Upper bounds of the buckets, in increasing order.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, [f'le="{_format_value(bound)}"'])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Holds the metrics and the collectors rendered by ``/metrics``.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def register_collector(self, collector):
+        """
+        Registers a function called on every scrape that returns extra samples.
+
+        Args:
+            collector: Function returning ``(name, labels, value)`` tuples, ``labels`` being a dictionary.
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Samples returned by the collectors are grouped by name, since the format requires the
+        samples of one metric to be contiguous.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        collected = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                collected.setdefault(name, []).append((labels, value))
+        for name, samples in collected.items():
+            lines.append(f"# TYPE {name} untyped")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("method",)
+)
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL queries issued per HTTP request.", ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_QUERY_SECONDS = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL queries per HTTP request.", ("method", "route")
+)
+QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements.", ("statement",)
+)
+QUERY_ERRORS = registry.counter(
+    "db_query_errors_total", "SQL statements that raised an error.", ("statement",)
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "upstream_request_duration_seconds", "Time spent in calls to upstream APIs.", ("endpoint", "outcome")
+)
+STARTUP_SECONDS = registry.gauge(
+    "app_startup_seconds", "Time spent in each phase of building and starting the application.", ("phase",)
+)
+
+
+class _RequestStats:
+    """
+    SQL activity of the request being handled.
+    """
+
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+_current_request = contextvars.ContextVar("metrics_current_request", default=None)
+
+
+def _route_label(scope):
+    # FastAPI resolves included routers lazily; the effective route carries the full, prefixed template
+    route = scope.get("fastapi", {}).get("effective_route_context") or scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    return "unmatched"  # No route matched, e.g. a 404; the raw path would explode the label set
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, in-flight requests and SQL activity per route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        stats = _RequestStats()
+        token = _current_request.set(stats)
+        # The route is only known once the router matched it, so requests in flight are counted per method
+        REQUESTS_IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = _route_label(scope)
+            REQUESTS_IN_FLIGHT.dec(method=method)
+            REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=status)
+            REQUEST_QUERIES.observe(stats.queries, method=method, route=route)
+            REQUEST_QUERY_SECONDS.observe(stats.query_seconds, method=method, route=route)
+            _current_request.reset(token)
+
+
+def _statement_kind(statement: str):
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _record_query(conn, statement):
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    QUERY_SECONDS.observe(elapsed, statement=_statement_kind(statement))
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn, statement)
+
+
+def _handle_error(context):
+    # A failing statement never reaches after_cursor_execute; drop its start time here, or it
+    # would stay on the pooled connection and be taken for the start of a later statement
+    conn = context.connection
+    if context.execution_context is None or conn is None or not conn.info.get("metrics_query_start"):
+        return
+    _record_query(conn, context.statement or "")
+    QUERY_ERRORS.inc(statement=_statement_kind(context.statement or ""))
+
+
+_engines_instrumented = False
+
+
+def instrument_engines():
+    """
+    Hooks query timing into every SQLAlchemy engine, including the engines behind the async sessions.
+    """
+    global _engines_instrumented
+    if not _engines_instrumented:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _engines_instrumented = True
+
+
+def observe_upstream(endpoint: str, seconds: float, outcome: str):
+    """
+    Records the latency of an upstream call.
+
+    Args:
+        endpoint (str): The upstream endpoint, e.g. ``google_books_search``.
+        seconds (float): The call duration.
+        outcome (str): The response status code, or why no response arrived, e.g. ``deadline``.
+    """
+    UPSTREAM_SECONDS.observe(seconds, endpoint=endpoint, outcome=outcome)
+
+
+def register_cache(name: str, cache):
+    """
+    Exports the counters and hit ratio of a TTLCache.
+
+    Args:
+        name (str): The cache name used as label value, e.g. ``search``.
+        cache (TTLCache): The cache.
+    """
+    def collect():
+        stats = cache.stats()
+        samples = [
+            ("cache_requests_total", {"cache": name, "result": result}, stats[result])
+            for result in ("hits", "stale_hits", "misses")
+        ]
+        for key in ("evictions", "expirations"):
+            samples.append((f"cache_{key}_total", {"cache": name}, stats[key]))
+        for key in ("entries", "bytes", "hit_ratio"):
+            samples.append((f"cache_{key}", {"cache": name}, stats[key]))
+        return samples
+
+    registry.register_collector(collect)
+
+
+def register_stats(prefix: str, stats, **labels):
+    """
+    Exports the numeric values of a component's ``stats()`` dictionary, one metric per key.
+
+    Args:
+        prefix (str): The metric name prefix, e.g. ``singleflight``.
+        stats: Function returning the stats dictionary. Nested dictionaries are flattened into the name.
+        **labels: Constant labels added to every value.
+    """
+    def flatten(values, name):
+        for key, value in values.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f"{name}_{key}")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{name}_{key}", labels, value
+
+    registry.register_collector(lambda: list(flatten(stats(), prefix)))
+
+
+metrics_routes = APIRouter()
+
+
+@metrics_routes.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Exposes all metrics in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,143 @@
+"""
+This module hashes and verifies user passwords for the self-learning application.
+
+bcrypt is deliberately slow (hundreds of milliseconds of CPU per call), so the work runs in a
+small dedicated process pool instead of the event loop or the request threadpool. Admission
+control caps the number of queued hashing jobs; once the cap is reached new requests are
+rejected with HTTP 503 instead of piling up behind the pool and delaying other traffic.
+
+The bcrypt cost factor comes from the ``BCRYPT_ROUNDS`` setting. Hashes created with a
+different cost are reported by :func:`verify_password_async` so the caller can store a rehash.
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException
+
+from .config import get_settings
+
+
+@lru_cache(maxsize=1)
+def pwd_context():
+    """
+    Returns the password hashing context, importing passlib on first use to keep startup fast.
+
+    Returns:
+        CryptContext: The bcrypt context with the configured cost factor.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=get_settings().bcrypt_rounds)
+
+_pool = None
+_max_pending = 0
+_pending = 0
+
+
+def hash_password(password: str):
+    """
+    Hashes the provided password using bcrypt with the configured cost factor.
+
+    Args:
+        password (str): The plain-text password to hash.
+
+    Returns:
+        str: The hashed password.
+    """
+    return pwd_context().hash(password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str):
+    """
+    Verifies a password and rehashes it when the stored hash uses an outdated cost factor.
+
+    Args:
+        plain_password (str): The plain-text password to verify.
+        hashed_password (str): The stored hash to compare against.
+
+    Returns:
+        tuple: ``(matches, new_hash)`` where ``new_hash`` is None unless the hash should be replaced.
+    """
+    return pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def start_hash_pool(max_workers: int = None, max_pending: int = None):
+    """
+    Starts (or restarts) the process pool used for password hashing.
+
+    Args:
+        max_workers (int, optional): Number of hashing processes, defaults to ``PASSWORD_HASH_WORKERS``.
+        max_pending (int, optional): Maximum number of jobs queued or running at once,
+            defaults to ``PASSWORD_HASH_MAX_PENDING``.
+    """
+    global _pool, _max_pending
+    settings = get_settings()
+    shutdown_hash_pool()
+    _pool = ProcessPoolExecutor(max_workers=max_workers or settings.password_hash_workers)
+    _max_pending = max_pending or settings.password_hash_max_pending
+
+
+def shutdown_hash_pool():
+    """
+    Stops the password hashing processes. Called from the FastAPI shutdown event.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _run_in_pool(function, *args):
+    """
+    Runs a hashing function in the process pool, rejecting the call when the pool is saturated.
+
+    Args:
+        function (callable): A module-level function of this module.
+        *args: Arguments for the function.
+
+    Returns:
+        The function's return value.
+    """
+    global _pending
+    if _pool is None:
+        start_hash_pool()
+    if _pending >= _max_pending:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many authentication requests in progress, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool, function, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str):
+    """
+    Hashes a password in the hashing process pool.
+
+    Args:
+        password (str): The plain-text password to hash.
+
+    Returns:
+        str: The hashed password.
+    """
+    return await _run_in_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    """
+    Verifies a password in the hashing process pool.
+
+    Args:
+        plain_password (str): The plain-text password to verify.
+        hashed_password (str): The stored hash to compare against.
+
+    Returns:
+        tuple: ``(matches, new_hash)`` where ``new_hash`` is None unless the hash should be replaced.
+    """
+    return await _run_in_pool(verify_and_update, plain_password, hashed_password)
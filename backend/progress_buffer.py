@@ -0,0 +1,228 @@
+"""
+This module implements the optional write-behind buffer for reading progress updates.
+
+Reader clients report progress every few pages, and most of those values are overwritten again
+seconds later. When ``PROGRESS_WRITE_BEHIND`` is enabled, ``/books/mark_read`` and the progress
+changes of ``/books/batch`` only record the latest value per (user, book) in memory. A background task writes all buffered values in one
+transaction every ``PROGRESS_FLUSH_INTERVAL_SECONDS``, sooner when ``PROGRESS_FLUSH_MAX_PENDING``
+updates are waiting, and once more on shutdown.
+
+Book listings overlay the buffered values, so clients always read their latest progress, and
+their ETags include a per-user generation of the buffer. Reading statistics, and the library
+versions of the affected users, are updated when the buffer is flushed.
+"""
+
+import asyncio
+import logging
+import secrets
+import sys
+from datetime import datetime
+
+from sqlalchemy import case, select, update
+
+from .cache import TTLCache
+from .config import get_settings
+from .database import AsyncSessionLocal
+from .database.models import Book, User
+from .reading_stats import record_progress
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBuffer:
+    """
+    In-memory buffer keeping the latest pages_read value per (user, book) until it is flushed.
+
+    Args:
+        enabled (bool): Whether progress updates go through the buffer.
+        flush_interval (float): Seconds between two flushes.
+        max_pending (int): Number of buffered books that triggers an early flush.
+    """
+
+    def __init__(self, enabled: bool, flush_interval: float, max_pending: int):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}  # user_id -> {book_id: (pages_read, updated_at)}
+        self._size = 0
+        # Values being written by the running flush; still served until their transaction commits
+        self._flushing = {}
+        self._flush_running = False
+        # Bumped on every change to a user's buffered values; never reset, so tokens are not reused
+        self._generations = {}
+        self._instance = secrets.token_hex(4)
+        # Titles of books whose ownership was already checked, keyed by (user_id, book_id)
+        self._owned_books = TTLCache(max_entries=10000, ttl=3600, sizeof=sys.getsizeof)
+        self._flush_requested = asyncio.Event()
+        self._task = None
+        self._stats = {"updates": 0, "flushes": 0, "flushed_books": 0}
+
+    def owned_book_title(self, user_id: int, book_id: int):
+        """
+        Returns the title of a book already known to belong to the user, or None if not checked yet.
+        """
+        return self._owned_books.get((user_id, book_id))
+
+    def remember_owned_book(self, user_id: int, book_id: int, title: str):
+        """
+        Records that a book belongs to the user, so later updates skip the ownership query.
+        """
+        self._owned_books.set((user_id, book_id), title)
+
+    def put(self, user_id: int, book_id: int, pages_read: int):
+        """
+        Buffers a progress update, replacing any buffered value for the same book.
+
+        Args:
+            user_id (int): The ID of the reading user.
+            book_id (int): The ID of the book.
+            pages_read (int): The number of pages read.
+        """
+        books = self._pending.setdefault(user_id, {})
+        if book_id not in books:
+            self._size += 1
+        books[book_id] = (pages_read, datetime.utcnow())
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        self._stats["updates"] += 1
+        if self._size >= self.max_pending:
+            self._flush_requested.set()
+
+    def pending_for_user(self, user_id: int):
+        """
+        Returns the buffered pages_read values of a user, including those of a flush not committed yet.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            dict: Buffered pages_read values keyed by book ID.
+        """
+        pending = self._pending.get(user_id, {})
+        flushing = self._flushing.get(user_id)
+        if flushing:
+            pending = {**flushing, **pending}
+        return {book_id: pages for book_id, (pages, _) in pending.items()}
+
+    def version_token(self, user_id: int):
+        """
+        Returns a token identifying the buffered values of a user, for use in ETags.
+
+        The token is empty while nothing is buffered for the user, and otherwise unique to this
+        process and to the state of the user's buffered values.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            str: The token.
+        """
+        if user_id not in self._pending and user_id not in self._flushing:
+            return ""
+        return f"{self._instance}.{self._generations[user_id]}"
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        """
+        Returns the buffer counters.
+
+        Returns:
+            dict: Buffered updates, flushes, flushed books and the number of books waiting.
+        """
+        return dict(self._stats, pending=self._size)
+
+    async def flush(self):
+        """
+        Writes every buffered update, with its reading statistics, in a single transaction.
+
+        The written values stay visible to ``pending_for_user`` and ``version_token`` until the
+        transaction commits, so listings never fall back to older values while a flush runs. If
+        the write fails or is cancelled the updates are put back, unless newer values arrived in
+        the meantime.
+        """
+        if not self._pending or self._flush_running:
+            return
+        self._flush_running = True
+        pending, self._pending, self._size = self._pending, {}, 0
+        self._flushing = pending
+        pages_by_book = {
+            book_id: pages
+            for books in pending.values()
+            for book_id, (pages, _) in books.items()
+        }
+        try:
+            async with AsyncSessionLocal() as db:
+                previous = dict((await db.execute(
+                    select(Book.id, Book.pages_read).where(Book.id.in_(pages_by_book))
+                )).all())
+                await db.execute(
+                    update(Book)
+                    .where(Book.id.in_(pages_by_book))
+                    .values(pages_read=case(pages_by_book, value=Book.id, else_=Book.pages_read))
+                    .execution_options(synchronize_session=False)
+                )
+                # The flushed values change the stored books, so their ETags must change as well
+                await db.execute(
+                    update(User)
+                    .where(User.id.in_(pending))
+                    .values(library_version=User.library_version + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                for user_id, books in pending.items():
+                    changes = [(book_id, previous.get(book_id), pages) for book_id, (pages, _) in books.items() if book_id in previous]
+                    await record_progress(db, user_id, changes, when=max(updated_at for _, updated_at in books.values()))
+                await db.commit()
+        except BaseException:
+            for user_id, books in pending.items():
+                current = self._pending.setdefault(user_id, {})
+                for book_id, value in books.items():
+                    if book_id not in current:
+                        current[book_id] = value
+                        self._size += 1
+            raise
+        finally:
+            self._flushing = {}
+            self._flush_running = False
+        self._stats["flushes"] += 1
+        self._stats["flushed_books"] += len(pages_by_book)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing buffered reading progress failed, retrying on the next interval")
+
+    def start(self):
+        """
+        Starts the background flush task. Called from the FastAPI startup event.
+        """
+        if self.enabled and self._task is None:
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the background flush task and writes what is still buffered. Called from the FastAPI shutdown event.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+progress_buffer = ProgressBuffer(
+    enabled=get_settings().progress_write_behind,
+    flush_interval=get_settings().progress_flush_interval_seconds,
+    max_pending=get_settings().progress_flush_max_pending,
+)
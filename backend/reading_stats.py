@@ -0,0 +1,172 @@
+"""
+This module records reading progress and keeps the reading statistics of every user up to date.
+
+Each progress update appends a row to ``reading_events`` and, in the same transaction, folds the
+change into two rollup tables: ``user_reading_stats`` (totals and streaks per user) and
+``daily_reading_stats`` (pages per user and day). Dashboards read the rollups directly, so the
+cost of serving statistics does not grow with the length of a user's reading history.
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import and_, case, insert, literal, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from .database.models import DailyReadingStats, ReadingEvent, UserReadingStats
+
+
+async def _upsert(db, model, values: dict, key: list, set_):
+    """
+    Inserts a row, or updates the existing row with the same key, in one statement where the database supports it.
+
+    PostgreSQL and SQLite use ``INSERT ... ON CONFLICT DO UPDATE`` and MySQL uses ``INSERT ... ON
+    DUPLICATE KEY UPDATE``. Other databases get an UPDATE followed, when no row matched, by an
+    INSERT in a savepoint, retried as an UPDATE if a concurrent transaction inserted the row first.
+
+    MySQL applies the assignments from left to right, so later expressions see the columns
+    assigned before them; ``set_`` must list a column after every expression reading its old value.
+
+    Args:
+        db (AsyncSession): The database session.
+        model: The mapped model to insert into.
+        values (dict): The column values of the new row.
+        key (list): The columns identifying the row.
+        set_: Function building the assignments of an update from the proposed row's columns.
+    """
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        statement = (postgresql if dialect == "postgresql" else sqlite).insert(model).values(**values)
+        await db.execute(statement.on_conflict_do_update(index_elements=key, set_=set_(statement.excluded)))
+        return
+    if dialect in ("mysql", "mariadb"):
+        statement = mysql.insert(model).values(**values)
+        await db.execute(statement.on_duplicate_key_update(list(set_(statement.inserted).items())))
+        return
+
+    columns = model.__table__.c
+    proposed = SimpleNamespace(**{name: literal(value, columns[name].type) for name, value in values.items()})
+    update_row = update(model).where(and_(*(column == values[column.key] for column in key))).values(set_(proposed))
+    if (await db.execute(update_row)).rowcount:
+        return
+    try:
+        async with db.begin_nested():
+            await db.execute(insert(model).values(**values))
+    except IntegrityError:
+        await db.execute(update_row)  # Inserted concurrently; update that row instead
+
+
+async def record_progress(db, user_id: int, changes: list, when: datetime = None):
+    """
+    Logs progress updates and updates the user's rollups. The caller commits the session.
+
+    Args:
+        db (AsyncSession): The database session holding the caller's transaction.
+        user_id (int): The ID of the reading user.
+        changes (list): ``(book_id, previous_pages_read, new_pages_read)`` tuples.
+        when (datetime, optional): When the progress was made, defaults to now (UTC).
+    """
+    if not changes:
+        return
+    when = when or datetime.utcnow()
+    today = when.date()
+
+    await db.execute(insert(ReadingEvent), [
+        {
+            "user_id": user_id,
+            "book_id": book_id,
+            "pages_read": new_pages,
+            "pages_delta": new_pages - (previous_pages or 0),
+            "created_at": when,
+        }
+        for book_id, previous_pages, new_pages in changes
+    ])
+
+    # Only forward progress counts as pages read; corrections downwards are kept in the log only
+    pages = sum(max(new_pages - (previous_pages or 0), 0) for _, previous_pages, new_pages in changes)
+    updates = len(changes)
+
+    await _upsert(
+        db, DailyReadingStats,
+        {"user_id": user_id, "day": today, "pages": pages, "progress_updates": updates},
+        key=[DailyReadingStats.user_id, DailyReadingStats.day],
+        set_=lambda new: {
+            "pages": DailyReadingStats.pages + new.pages,
+            "progress_updates": DailyReadingStats.progress_updates + new.progress_updates,
+        },
+    )
+
+    # Reading on the day after the last reading day extends the streak, a longer gap restarts it
+    streak = case(
+        (UserReadingStats.last_read_on >= today, UserReadingStats.current_streak),
+        (UserReadingStats.last_read_on == today - timedelta(days=1), UserReadingStats.current_streak + 1),
+        else_=1,
+    )
+    await _upsert(
+        db, UserReadingStats,
+        {
+            "user_id": user_id,
+            "total_pages": pages,
+            "progress_updates": updates,
+            "days_read": 1,
+            "current_streak": 1,
+            "longest_streak": 1,
+            "last_read_on": today,
+        },
+        key=[UserReadingStats.user_id],
+        # The streaks read current_streak and last_read_on, so those are assigned after them
+        set_=lambda new: {
+            "total_pages": UserReadingStats.total_pages + new.total_pages,
+            "progress_updates": UserReadingStats.progress_updates + new.progress_updates,
+            "days_read": UserReadingStats.days_read + case((UserReadingStats.last_read_on < today, 1), else_=0),
+            "longest_streak": case(
+                (streak > UserReadingStats.longest_streak, streak), else_=UserReadingStats.longest_streak
+            ),
+            "current_streak": streak,
+            "last_read_on": case(
+                (UserReadingStats.last_read_on < today, today), else_=UserReadingStats.last_read_on
+            ),
+        },
+    )
+
+
+async def get_reading_stats(db, user_id: int, days: int = 30, today=None):
+    """
+    Reads a user's reading statistics from the rollup tables.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the user.
+        days (int): How many recent days of daily totals to return.
+        today (date, optional): The current (UTC) day, defaults to today.
+
+    Returns:
+        dict: Totals, streaks and the daily pages of the recent days that had reading activity.
+    """
+    today = today or datetime.utcnow().date()
+    totals = await db.get(UserReadingStats, user_id)
+    daily = await db.execute(
+        select(DailyReadingStats.day, DailyReadingStats.pages, DailyReadingStats.progress_updates)
+        .where(DailyReadingStats.user_id == user_id, DailyReadingStats.day > today - timedelta(days=days))
+        .order_by(DailyReadingStats.day)
+    )
+
+    if totals is None:
+        summary = {"total_pages": 0, "progress_updates": 0, "days_read": 0, "current_streak": 0, "longest_streak": 0, "last_read_on": None}
+    else:
+        # A streak is only current while the user read today or yesterday
+        streak_alive = totals.last_read_on is not None and totals.last_read_on >= today - timedelta(days=1)
+        summary = {
+            "total_pages": totals.total_pages,
+            "progress_updates": totals.progress_updates,
+            "days_read": totals.days_read,
+            "current_streak": totals.current_streak if streak_alive else 0,
+            "longest_streak": totals.longest_streak,
+            "last_read_on": totals.last_read_on,
+        }
+    summary["daily"] = [
+        {"day": row.day, "pages": row.pages, "progress_updates": row.progress_updates}
+        for row in daily
+    ]
+    return summary
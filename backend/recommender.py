@@ -0,0 +1,417 @@
+"""
+This module implements the content-based book recommender behind ``/books/recommendations``.
+
+Every volume the service sees (saved books and Google Books results) is turned into a sparse
+term-frequency vector over the title, author and description, using the hashing trick so the
+vocabulary never has to be rebuilt. Vectors are stacked into a SciPy sparse matrix. A user's
+profile vector is the sum of the vectors of their books, with favorites counting double, and
+recommendations are the catalog rows with the highest TF-IDF weighted cosine similarity to it.
+
+The catalog grows incrementally: new rows are collected in a small delta matrix that is merged
+into the main column-compressed matrix once it reaches a fraction of its size. Document
+frequencies are kept up to date on every insert and IDF weights are applied on the query side,
+so adding books never requires re-weighting existing rows. Scoring only touches the matrix
+columns of the profile's terms, which keeps queries in the millisecond range on catalogs of
+hundreds of thousands of books.
+"""
+
+import asyncio
+import logging
+import math
+import re
+import sys
+import threading
+import zlib
+from collections import Counter
+
+from sqlalchemy import select, text
+
+from .cache import TTLCache
+from .database import engine
+from .database.models import Book
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 2 ** 18
+
+# Favorites weigh more than other books in a user's profile
+FAVORITE_WEIGHT = 2.0
+GENRE_WEIGHT = 1.0
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have he her his in is it its no not of on or "
+    "she that the their they this to was were which will with you your".split()
+)
+
+
+def book_key(title: str, author: str):
+    """
+    Builds the key used to recognise the same book across the catalog and a user's library.
+
+    Args:
+        title (str): The book title.
+        author (str): The book author(s).
+
+    Returns:
+        str: The normalized title and author.
+    """
+    return f"{' '.join((title or '').lower().split())}|{' '.join((author or '').lower().split())}"
+
+
+class _FeatureIndex(dict):
+    """
+    Maps tokens to hashed feature indices, memoizing the hash. Stop words and single characters map to -1.
+    """
+
+    def __init__(self, n_features: int):
+        super().__init__()
+        self.n_features = n_features
+
+    def __missing__(self, token: str):
+        if len(token) < 2 or token in _STOP_WORDS:
+            feature = -1
+        else:
+            feature = zlib.crc32(token.encode()) % self.n_features
+        self[token] = feature
+        return feature
+
+
+# NumPy and SciPy, imported by the first Recommender
+np = sparse = None
+
+
+def _import_numeric():
+    """
+    Imports NumPy and SciPy, most of the backend's import time, when the recommender is first built.
+    """
+    global np, sparse
+    import numpy as np
+    from scipy import sparse
+
+
+class Recommender:
+    """
+    Incrementally updated sparse TF-IDF index answering top-k cosine similarity queries.
+
+    Args:
+        n_features (int): Size of the hashed feature space.
+        merge_fraction (float): Delta size, relative to the main matrix, that triggers a merge.
+    """
+
+    def __init__(self, n_features: int = N_FEATURES, merge_fraction: float = 0.05):
+        _import_numeric()
+        self.n_features = n_features
+        self.merge_fraction = merge_fraction
+        self._lock = threading.Lock()
+        self._features = _FeatureIndex(n_features)
+        self._rows = {}  # volume ID -> row number
+        self._books = []  # row number -> (volume ID, title, author)
+        self._rows_by_key = {}  # book_key -> row numbers
+        self._document_frequency = np.zeros(n_features, dtype=np.int32)
+        self._matrix = sparse.csc_matrix((0, n_features), dtype=np.float32)
+        # Rows added since the last merge into the column-compressed main matrix
+        self._delta, self._delta_rows, self._delta_cache = [], 0, None
+
+    def vectorize_many(self, texts):
+        """
+        Turns texts into L2-normalized sublinear term-frequency vectors, one matrix row per text.
+
+        Args:
+            texts (list): The texts to vectorize.
+
+        Returns:
+            csr_matrix: The term-frequency matrix, with sorted feature indices in every row.
+        """
+        rows, features, frequencies = [], [], []
+        for row, text_value in enumerate(texts):
+            counts = Counter(_TOKEN_PATTERN.findall(text_value.lower()))
+            rows.extend([row] * len(counts))
+            features.extend(map(self._features.__getitem__, counts))
+            frequencies.extend(counts.values())
+        rows, features = np.array(rows, dtype=np.int32), np.array(features, dtype=np.int32)
+        kept = features >= 0  # Drop stop words
+        matrix = sparse.csr_matrix(
+            (1.0 + np.log(np.array(frequencies, dtype=np.float32)[kept]), (rows[kept], features[kept])),
+            shape=(len(texts), self.n_features),
+            dtype=np.float32,
+        )
+        # Building from coordinates adds up tokens that hash to the same feature
+        matrix.sum_duplicates()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1), dtype=np.float32).ravel())
+        norms[norms == 0] = 1.0
+        matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+        return matrix
+
+    def vectorize(self, text_value: str):
+        """
+        Turns text into an L2-normalized sublinear term-frequency vector.
+
+        Args:
+            text_value (str): The text to vectorize.
+
+        Returns:
+            tuple: Sorted feature indices and their weights, as NumPy arrays.
+        """
+        matrix = self.vectorize_many([text_value])
+        return matrix.indices, matrix.data
+
+    def __len__(self):
+        return len(self._books)
+
+    def add_documents(self, volumes):
+        """
+        Adds volumes to the catalog. Volumes already in the catalog are skipped.
+
+        Args:
+            volumes (list): Volumes with ``id``, ``title``, ``author`` and ``description`` keys.
+        """
+        with self._lock:
+            new_volumes = {}
+            for volume in volumes:
+                volume_id = volume.get("id")
+                if volume_id and volume_id not in self._rows:
+                    new_volumes.setdefault(volume_id, volume)
+            if not new_volumes:
+                return
+
+            rows = self.vectorize_many([
+                " ".join(filter(None, (volume.get("title"), volume.get("author"), volume.get("description"))))
+                for volume in new_volumes.values()
+            ])
+            for volume_id, volume in new_volumes.items():
+                row = len(self._books)
+                self._rows[volume_id] = row
+                self._books.append((volume_id, volume.get("title"), volume.get("author")))
+                self._rows_by_key.setdefault(book_key(volume.get("title"), volume.get("author")), []).append(row)
+            # Every feature appears at most once per row, so its count is its document frequency
+            self._document_frequency += np.bincount(rows.indices, minlength=self.n_features).astype(np.int32)
+            self._delta.append(rows)
+            self._delta_rows += rows.shape[0]
+            self._delta_cache = None
+
+            if self._delta_rows > max(1000, self.merge_fraction * self._matrix.shape[0]):
+                self._matrix = sparse.vstack([self._matrix, self._delta_matrix()], format="csc")
+                self._delta, self._delta_rows, self._delta_cache = [], 0, None
+
+    def _delta_matrix(self):
+        if not self._delta:
+            return None
+        if self._delta_cache is None:
+            self._delta_cache = sparse.vstack(self._delta, format="csr")
+        return self._delta_cache
+
+    def _idf(self, features):
+        documents = len(self._books)
+        return np.log((1.0 + documents) / (1.0 + self._document_frequency[features])).astype(np.float32) + 1.0
+
+    def recommend(self, profile: dict, exclude_keys=(), limit: int = 10):
+        """
+        Returns the catalog books most similar to a profile vector.
+
+        Args:
+            profile (dict): Term weights of the profile, keyed by feature index.
+            exclude_keys (iterable): ``book_key`` values of books to leave out, e.g. the user's own books.
+            limit (int): The maximum number of recommendations.
+
+        Returns:
+            list: Recommended books (with id, title, author and score), best first.
+        """
+        if not profile:
+            return []
+        with self._lock:
+            if not self._books:
+                return []
+            features = np.fromiter(profile.keys(), dtype=np.int32, count=len(profile))
+            weights = np.fromiter(profile.values(), dtype=np.float32, count=len(profile))
+            # IDF is applied to both the document and the profile side of the dot product
+            query = weights * self._idf(features) ** 2
+            query /= np.linalg.norm(query)
+
+            scores = np.zeros(len(self._books), dtype=np.float32)
+            base_rows = self._matrix.shape[0]
+            if base_rows:
+                scores[:base_rows] = self._matrix[:, features] @ query
+            delta = self._delta_matrix()
+            if delta is not None:
+                scores[base_rows:] = delta[:, features] @ query
+
+            for key in exclude_keys:
+                for row in self._rows_by_key.get(key, ()):
+                    scores[row] = 0.0
+
+            limit = min(limit, len(scores))
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"id": self._books[row][0], "title": self._books[row][1], "author": self._books[row][2], "score": round(float(scores[row]), 4)}
+                for row in top
+                if scores[row] > 0
+            ]
+
+    def load_catalog(self, batch_size: int = 5000):
+        """
+        Fills the catalog from the volumes stored in the local search index. Called once on startup.
+
+        Args:
+            batch_size (int): Number of rows read from the database at a time.
+        """
+        if engine.dialect.name != "sqlite":
+            return  # The search index, and so the stored catalog, only exists on SQLite
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(text(
+                "SELECT volume_id, title, author, description FROM search_documents WHERE volume_id IS NOT NULL"
+            ))
+            for rows in result.partitions():
+                self.add_documents([
+                    {"id": row.volume_id, "title": row.title, "author": row.author, "description": row.description}
+                    for row in rows
+                ])
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+_catalog_task = None
+
+
+def get_recommender():
+    """
+    Returns the process-wide recommender, building it on first use.
+
+    Returns:
+        Recommender: The recommender.
+    """
+    global _recommender
+    if _recommender is None:
+        with _recommender_lock:
+            if _recommender is None:
+                _recommender = Recommender()
+    return _recommender
+
+
+def _load_catalog():
+    try:
+        recommender = get_recommender()
+        recommender.load_catalog()
+        logger.info("Loaded %d books into the recommender catalog", len(recommender))
+    except Exception:
+        logger.exception("Loading the recommender catalog failed, it will only contain books seen from now on")
+
+
+async def warm_recommender():
+    """
+    Builds the recommender, importing NumPy and SciPy, in a worker thread. Called from the FastAPI
+    startup event, so the first request using it does not pay for the imports on the event loop.
+    """
+    await asyncio.to_thread(get_recommender)
+
+
+def start_catalog_loading():
+    """
+    Builds the recommender and loads the stored catalog in a worker thread, so startup does not wait for either. Called from the FastAPI startup event.
+    """
+    global _catalog_task
+    if _catalog_task is None:
+        _catalog_task = asyncio.create_task(asyncio.to_thread(_load_catalog))
+
+# Profile vectors of users, dropped whenever their library changes
+_profiles = TTLCache(max_entries=10000, ttl=3600, sizeof=sys.getsizeof)
+
+
+def invalidate_profile(user_id: int):
+    """
+    Drops the cached profile of a user. Call this whenever the user's books or favorites change.
+
+    Args:
+        user_id (int): The ID of the user.
+    """
+    _profiles.delete(user_id)
+
+
+async def user_profile(db, user_id: int):
+    """
+    Returns the profile vector of a user, building it from their books when not cached.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the user.
+
+    Returns:
+        tuple: The profile (term weights keyed by feature index) and the ``book_key`` values of the user's books.
+    """
+    cached = _profiles.get(user_id)
+    if cached is not None:
+        return cached
+
+    rows = (await db.execute(
+        select(Book.title, Book.author, Book.description, Book.is_favorite).where(Book.user_id == user_id)
+    )).all()
+    # Vectorizing a large library takes a while, so it runs in a worker thread
+    profile, keys = await asyncio.to_thread(_build_profile, rows)
+
+    _profiles.set(user_id, (profile, keys))
+    return profile, keys
+
+
+def _build_profile(rows):
+    profile, keys = {}, set()
+    for row in rows:
+        keys.add(book_key(row.title, row.author))
+        weight = FAVORITE_WEIGHT if row.is_favorite else 1.0
+        features, weights = get_recommender().vectorize(" ".join(filter(None, (row.title, row.author, row.description))))
+        for feature, value in zip(features.tolist(), weights.tolist()):
+            profile[feature] = profile.get(feature, 0.0) + weight * value
+    return profile, keys
+
+
+def with_genre(profile: dict, genre: str):
+    """
+    Returns a copy of a profile steered towards a genre.
+
+    Args:
+        profile (dict): The user's profile vector.
+        genre (str): The genre or topic to favour.
+
+    Returns:
+        dict: The combined profile vector.
+    """
+    combined = dict(profile)
+    features, weights = get_recommender().vectorize(genre)
+    # Scale the genre to the size of the profile so it matters for large libraries too
+    scale = GENRE_WEIGHT * max(1.0, math.sqrt(sum(value * value for value in profile.values())))
+    for feature, value in zip(features.tolist(), weights.tolist()):
+        combined[feature] = combined.get(feature, 0.0) + scale * value
+    return combined
+
+
+async def add_to_catalog(volumes):
+    """
+    Adds volumes to the recommender catalog in a worker thread.
+
+    An insert can merge the delta into the main matrix, and wait for the catalog loading holding
+    the recommender lock, so it never runs on the event loop.
+
+    Args:
+        volumes (list): Volumes with ``id``, ``title``, ``author`` and ``description`` keys.
+    """
+    await asyncio.to_thread(lambda: get_recommender().add_documents(volumes))
+
+
+async def recommend(profile: dict, exclude_keys=(), limit: int = 10, genre: str = None):
+    """
+    Returns the catalog books most similar to a profile, computed in a worker thread.
+
+    Args:
+        profile (dict): The user's profile vector.
+        exclude_keys (iterable): ``book_key`` values of books to leave out, e.g. the user's own books.
+        limit (int): The maximum number of recommendations.
+        genre (str, optional): A genre or topic to steer the profile towards.
+
+    Returns:
+        list: Recommended books (with id, title, author and score), best first.
+    """
+    def run():
+        steered = with_genre(profile, genre) if genre else profile
+        return get_recommender().recommend(steered, exclude_keys=exclude_keys, limit=limit)
+
+    return await asyncio.to_thread(run)
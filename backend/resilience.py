@@ -0,0 +1,268 @@
+"""
+This module bounds the time and the damage of upstream calls such as the Google Books API.
+
+Every call made through an ``UpstreamGuard`` gets:
+
+- a deadline budget covering the whole call, retries and hedges included;
+- a circuit breaker that opens when too many recent calls failed or were slow, so calls fail
+  fast instead of queueing behind a struggling upstream. After a cool-down a few probe calls
+  are let through, and the circuit closes again once they succeed;
+- optionally, hedging: when the first attempt is still running after the observed p95 latency,
+  a second identical attempt is sent and whichever answers first wins.
+
+Callers decide what to serve when a call is refused or fails, e.g. cached or local results.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+import httpx
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upstream responses counted as failures by the circuit breaker
+_FAILURE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised when an upstream call is refused by the open circuit, exceeds its deadline, or fails in transport.
+
+    Args:
+        reason (str): ``"circuit_open"``, ``"deadline"`` or ``"transport"``.
+        retry_after (float, optional): Seconds until the circuit lets calls through again.
+    """
+
+    def __init__(self, reason: str, retry_after: float = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of recent calls and opens when their failure rate crosses a threshold.
+
+    Args:
+        failure_ratio (float): Fraction of failed or slow calls in the window that opens the circuit.
+        window (int): Number of recent calls considered.
+        min_calls (int): Calls needed in the window before the circuit may open.
+        open_seconds (float): How long the circuit stays open before probing the upstream again.
+        half_open_calls (int): Successful probe calls needed to close the circuit again.
+    """
+
+    def __init__(self, failure_ratio: float, window: int, min_calls: int, open_seconds: float, half_open_calls: int = 3):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # True for failed or slow calls
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def retry_after(self):
+        """
+        Returns the seconds until an open circuit starts probing again, 0 when it is not open.
+        """
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def allow(self):
+        """
+        Tells whether a call may go out now. In the half-open state only a few probe calls are allowed.
+
+        Returns:
+            bool: True if the call may be made.
+        """
+        if self.state == OPEN and self.retry_after() == 0:
+            self.state, self._probes, self._probe_successes = HALF_OPEN, 0, 0
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and self._probes < self.half_open_calls:
+            self._probes += 1
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def record(self, failed: bool):
+        """
+        Records the outcome of an allowed call.
+
+        Args:
+            failed (bool): Whether the call failed or was slower than acceptable.
+        """
+        if self.state == HALF_OPEN:
+            if failed:
+                self._open()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+            return
+        self._outcomes.append(failed)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and sum(self._outcomes) >= self.failure_ratio * len(self._outcomes)
+        ):
+            self._open()
+
+    def release(self):
+        """
+        Gives back the probe slot of an allowed call that ended without an outcome, e.g. because it was cancelled.
+        """
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+
+    def stats(self):
+        """
+        Returns the state of the circuit and its counters.
+
+        Returns:
+            dict: The state, times opened, rejected calls and seconds until the next probe.
+        """
+        return dict(self._stats, state=self.state, retry_after=round(self.retry_after(), 1))
+
+
+class UpstreamGuard:
+    """
+    Wraps upstream calls with a deadline, a circuit breaker and optional hedging.
+
+    Args:
+        deadline (float): Seconds the whole call may take.
+        slow_call (float): Calls slower than this count as failures for the circuit breaker.
+        breaker (CircuitBreaker): The circuit breaker guarding the upstream.
+        hedge (bool): Whether to send a second attempt when the first passes the p95 latency.
+        hedge_min_delay (float): Lower bound of the hedging delay, in seconds.
+        latency_samples (int): Number of recent latencies the p95 is computed from.
+    """
+
+    def __init__(self, deadline: float, slow_call: float, breaker: CircuitBreaker, hedge: bool = False, hedge_min_delay: float = 0.05, latency_samples: int = 200):
+        self.deadline = deadline
+        self.slow_call = slow_call
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self._latencies = deque(maxlen=latency_samples)
+        self._stats = {"calls": 0, "failures": 0, "deadline_exceeded": 0, "hedged": 0, "hedge_wins": 0}
+
+    def p95(self):
+        """
+        Returns the p95 latency of recent successful attempts, or None until enough were observed.
+
+        Returns:
+            float: The latency in seconds.
+        """
+        if len(self._latencies) < 20:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    async def _attempt(self, send):
+        started = time.monotonic()
+        response = await send()
+        if response.status_code not in _FAILURE_STATUSES:
+            self._latencies.append(time.monotonic() - started)
+        return response
+
+    async def _hedged(self, send):
+        """
+        Runs ``send`` and, when it is still running after the hedging delay, a second copy of it.
+
+        Returns:
+            The first successful response, or the error of the last attempt to fail.
+        """
+        delay = self.p95()
+        tasks = [asyncio.ensure_future(self._attempt(send))]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=max(delay, self.hedge_min_delay))
+                if not done:
+                    self._stats["hedged"] += 1
+                    tasks.append(asyncio.ensure_future(self._attempt(send)))
+
+            pending, error = list(tasks), None
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.remove(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is not tasks[0]:
+                        self._stats["hedge_wins"] += 1
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, send):
+        """
+        Makes an upstream call within the deadline, unless the circuit is open.
+
+        Args:
+            send: Coroutine function without arguments sending one attempt and returning the ``httpx.Response``.
+                It may be called twice when hedging, so it must be idempotent.
+
+        Returns:
+            httpx.Response: The upstream response.
+
+        Raises:
+            UpstreamUnavailable: If the circuit is open, the deadline passed, or the request failed in transport.
+
+        Every allowed call is recorded by the circuit breaker, unexpected errors as failures, except
+        cancelled calls, which tell nothing about the upstream and only give back their probe slot.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("circuit_open", retry_after=self.breaker.retry_after())
+
+        self._stats["calls"] += 1
+        started = time.monotonic()
+        failed = True
+        try:
+            response = await asyncio.wait_for(self._hedged(send) if self.hedge else self._attempt(send), timeout=self.deadline)
+            failed = response.status_code in _FAILURE_STATUSES or time.monotonic() - started > self.slow_call
+            return response
+        except asyncio.TimeoutError:
+            self._stats["deadline_exceeded"] += 1
+            raise UpstreamUnavailable("deadline")
+        except httpx.HTTPError:
+            raise UpstreamUnavailable("transport")
+        except asyncio.CancelledError:
+            failed = None
+            self.breaker.release()
+            raise
+        finally:
+            if failed is not None:
+                self._record(failed)
+
+    def _record(self, failed: bool):
+        if failed:
+            self._stats["failures"] += 1
+        self.breaker.record(failed)
+
+    def stats(self):
+        """
+        Returns the call counters, the observed p95 latency and the circuit breaker state.
+
+        Returns:
+            dict: Calls, failures, deadline overruns, hedged calls and hedges that won, p95 and circuit state.
+        """
+        p95 = self.p95()
+        return dict(self._stats, p95_seconds=None if p95 is None else round(p95, 4), circuit=self.breaker.stats())
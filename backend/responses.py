@@ -0,0 +1,41 @@
+"""
+This module provides the JSON response class used by every route of the backend.
+
+Responses are encoded with orjson, which serializes lists of plain dictionaries an order of
+magnitude faster than the standard library. When orjson is not installed the standard
+``json`` module is used instead, so it stays an optional dependency.
+"""
+
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def dumps(content):
+    """
+    Encodes JSON-compatible content, including datetimes and dates, to JSON bytes.
+
+    Args:
+        content: The content to encode.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when it is installed.
+    """
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,176 @@
+"""
+This module defines the Pydantic request and response models of the backend API.
+
+Every route declares its response model, so FastAPI validates and serializes responses with
+Pydantic's compiled serializer instead of introspecting arbitrary objects, and only the
+declared fields ever reach the client.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class Message(BaseModel):
+    """
+    A human-readable confirmation of a completed action.
+    """
+    message: str
+
+
+class Token(BaseModel):
+    """
+    An access token issued by /auth/login.
+    """
+    access_token: str
+    token_type: str
+
+
+class UserOut(BaseModel):
+    """
+    The authenticated user, as returned by /auth/me.
+    """
+    id: int
+    username: str
+    email: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class Profile(BaseModel):
+    """
+    The profile of the authenticated user, as returned by /users/profile.
+    """
+    username: str
+    email: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class Volume(BaseModel):
+    """
+    A Google Books volume or a match from the local search index.
+    """
+    id: Optional[str] = None  # None for legacy books indexed without a volume ID
+    title: str
+    author: Optional[str] = None
+    description: Optional[str] = None
+
+
+class SearchResults(BaseModel):
+    """
+    Books found for a search and whether they came from Google Books or the local index.
+    """
+    books: List[Volume]
+    source: Literal["local", "upstream"]
+
+
+class FailedBook(BaseModel):
+    """
+    A book that /add_books could not add, with the reason.
+    """
+    book_id: str
+    detail: str
+
+
+class AddedBooks(BaseModel):
+    """
+    The outcome of /add_books.
+    """
+    added: List[str]
+    failed: List[FailedBook]
+
+
+class BookOperation(BaseModel):
+    """
+    A single change to one of the user's books, as sent to /batch.
+    """
+    op: Literal["mark_read", "add_favorite", "remove_favorite"]
+    book_id: int
+    pages_read: Optional[int] = None
+
+
+class OperationResult(BaseModel):
+    """
+    The outcome of one /batch operation.
+    """
+    op: str
+    book_id: int
+    status: Literal["ok", "error"]
+    detail: Optional[str] = None
+
+
+class BatchResults(BaseModel):
+    """
+    The outcome of /batch, one result per operation in request order.
+    """
+    results: List[OperationResult]
+    updated: int
+
+
+class DailyReading(BaseModel):
+    """
+    The pages read by a user on one day.
+    """
+    day: date
+    pages: int
+    progress_updates: int
+
+
+class ReadingStats(BaseModel):
+    """
+    The reading statistics of a user.
+    """
+    total_pages: int
+    progress_updates: int
+    days_read: int
+    current_streak: int
+    longest_streak: int
+    last_read_on: Optional[date] = None
+    daily: List[DailyReading]
+
+
+class Recommendation(BaseModel):
+    """
+    A recommended book with its similarity score.
+    """
+    id: str
+    title: Optional[str] = None
+    author: Optional[str] = None
+    score: float
+
+
+class Recommendations(BaseModel):
+    """
+    The books recommended to a user, best first.
+    """
+    books: List[Recommendation]
+
+
+class MyBook(BaseModel):
+    """
+    A book in the user's list. Only the ID and the requested fields are set.
+    """
+    id: int
+    title: Optional[str] = None
+    author: Optional[str] = None
+    description: Optional[str] = None
+    pages_read: Optional[int] = None
+    is_favorite: Optional[bool] = None
+
+
+class MyBooksPage(BaseModel):
+    """
+    A page of the user's books and the cursor of the next page.
+    """
+    books: List[MyBook]
+    next_cursor: Optional[int] = None
+
+
+class SearchPathStatus(BaseModel):
+    """
+    Counters of the search cache, the cache warmer, request coalescing and the upstream guard.
+    """
+    cache: Dict[str, Any]
+    warm_queries: List[Dict[str, Any]]
+    coalescing: Dict[str, Dict[str, Any]]
+    upstream: Dict[str, Any]
@@ -0,0 +1,108 @@
+"""
+This module maintains a local full-text search index over every book the service has seen.
+
+Books saved by users and volumes returned by the Google Books API are stored in the
+``search_documents`` table, which backs an SQLite FTS5 index (created by migration 4). Searches are answered from the
+index with BM25 ranking, so common queries do not need an upstream round trip.
+
+The index is only available on SQLite; on other databases every function is a no-op.
+"""
+
+from sqlalchemy import text
+
+from .database import async_engine, async_read_engine, engine
+
+# Relative BM25 weights of the title, author and description columns
+_BM25_WEIGHTS = "10.0, 5.0, 1.0"
+
+# Insert a document, or refresh it when its text changed
+_UPSERT = text(
+    """
+    INSERT INTO search_documents (doc_key, volume_id, title, author, description)
+    VALUES (:doc_key, :volume_id, :title, :author, :description)
+    ON CONFLICT (doc_key) DO UPDATE SET
+        title = excluded.title, author = excluded.author, description = excluded.description
+    WHERE title IS NOT excluded.title
+       OR author IS NOT excluded.author
+       OR description IS NOT excluded.description
+    """
+)
+
+_SEARCH = text(
+    f"""
+    SELECT d.volume_id, d.title, d.author, d.description
+    FROM search_documents_fts
+    JOIN search_documents AS d ON d.rowid = search_documents_fts.rowid
+    WHERE search_documents_fts MATCH :match
+    ORDER BY bm25(search_documents_fts, {_BM25_WEIGHTS})
+    LIMIT :limit
+    """
+)
+
+
+def is_enabled():
+    """
+    Tells whether the local search index is supported by the configured database.
+
+    Returns:
+        bool: True on SQLite, False otherwise.
+    """
+    return engine.dialect.name == "sqlite"
+
+
+async def index_volumes(volumes):
+    """
+    Adds or refreshes volumes in the index. Unchanged volumes are left untouched.
+
+    Args:
+        volumes (list): Volumes with ``id``, ``title``, ``author`` and ``description`` keys.
+    """
+    if not is_enabled() or not volumes:
+        return
+    rows = [
+        {
+            "doc_key": volume["id"],
+            "volume_id": volume["id"],
+            "title": volume["title"],
+            "author": volume.get("author"),
+            "description": volume.get("description"),
+        }
+        for volume in volumes
+    ]
+    async with async_engine.begin() as conn:
+        await conn.execute(_UPSERT, rows)
+
+
+def _match_expression(query: str):
+    """
+    Turns free text into an FTS5 match expression requiring every word, ignoring FTS5 operators.
+
+    Args:
+        query (str): The user's search text.
+
+    Returns:
+        str: The match expression, empty if the query has no words.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+async def search_local(query: str, limit: int = 20):
+    """
+    Searches the local index and returns the best matches first.
+
+    Args:
+        query (str): The search text (e.g., genre or topic).
+        limit (int): The maximum number of results.
+
+    Returns:
+        list: Books (with id, title, author, and description) in relevance order.
+    """
+    match = _match_expression(query)
+    if not is_enabled() or not match:
+        return []
+    async with async_read_engine.connect() as conn:
+        rows = (await conn.execute(_SEARCH, {"match": match, "limit": limit})).fetchall()
+    return [
+        {"id": row.volume_id, "title": row.title, "author": row.author, "description": row.description}
+        for row in rows
+    ]
@@ -0,0 +1,62 @@
+"""
+This module implements single-flight coalescing of identical concurrent calls.
+
+When a popular cache entry expires, many requests miss at the same moment. Instead of each of
+them calling Google Books, the first caller for a key starts the fetch and every caller that
+arrives while it is running awaits that same fetch, receiving its result or its error.
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time and shares its outcome with concurrent callers.
+
+    The call runs in its own task, so a caller that is cancelled (e.g. because its client went
+    away) does not cancel the fetch for the others.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> task of the call in flight
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+
+    async def do(self, key, function):
+        """
+        Calls ``function()`` unless a call for the same key is already running, and returns its result.
+
+        Args:
+            key: The key identifying equivalent calls (e.g., the normalized query).
+            function: Coroutine function without arguments performing the call.
+
+        Returns:
+            The result of the call. Its exception is raised to every waiting caller instead.
+        """
+        self._stats["calls"] += 1
+        task = self._calls.get(key)
+        if task is None:
+            self._stats["executions"] += 1
+            task = self._calls[key] = asyncio.ensure_future(function())
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved, even when every caller was cancelled before it arrived
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+
+    def __len__(self):
+        return len(self._calls)
+
+    def stats(self):
+        """
+        Returns the coalescing counters.
+
+        Returns:
+            dict: Calls, executed calls, coalesced calls, failed executions and the calls in flight.
+        """
+        return dict(self._stats, in_flight=len(self._calls))
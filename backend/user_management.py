@@ -6,22 +6,25 @@ All routes follow PEP8 style guidelines and secure handling of user data.
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .database import get_db
-from backend.database.models import User
-from .auth import get_current_user  # To ensure only authenticated users can access profile information
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_db
+from .schemas import Message, Profile
+from backend.database.models import Book, DailyReadingStats, ReadingEvent, User, UserReadingStats
+from .auth import Principal, get_current_user, invalidate_principal  # To ensure only authenticated users can access profile information
 
 # Create the FastAPI router for user profile management routes
 user_management_routes = APIRouter()
 
-@user_management_routes.get("/profile")
-def get_user_profile(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@user_management_routes.get("/profile", response_model=Profile)
+async def get_user_profile(current_user: Principal = Depends(get_current_user)):
     """
     Retrieves the profile information for the authenticated user.
 
+    The profile is served from the cached principal, so no database query is needed.
+
     Args:
-        db (Session): The database session dependency.
-        current_user (User): The currently authenticated user, fetched via JWT.
+        current_user (Principal): The currently authenticated user, fetched via JWT.
 
     Returns:
         dict: A dictionary containing the user's profile information.
@@ -32,43 +35,50 @@ def get_user_profile(db: Session = Depends(get_db), current_user: User = Depends
         "created_at": current_user.created_at,  # When the user was created
     }
 
-@user_management_routes.put("/profile")
-def update_user_profile(username: str = None, email: str = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@user_management_routes.put("/profile", response_model=Message)
+async def update_user_profile(username: str = None, email: str = None, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user)):
     """
     Updates the user's profile information, including username and email.
 
     Args:
         username (str, optional): The new username to update.
         email (str, optional): The new email to update.
-        db (Session): The database session dependency.
-        current_user (User): The currently authenticated user.
+        db (AsyncSession): The database session dependency.
+        current_user (Principal): The currently authenticated user.
 
     Returns:
         dict: A success message indicating the profile was updated.
     """
+    db_user = await db.get(User, current_user.id)
     if username:
-        current_user.username = username
+        db_user.username = username
     if email:
-        current_user.email = email
+        db_user.email = email
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await invalidate_principal(current_user.id)
 
     return {"message": "Profile updated successfully."}
 
-@user_management_routes.delete("/profile")
-def delete_user_profile(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@user_management_routes.delete("/profile", response_model=Message)
+async def delete_user_profile(db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user)):
     """
     Deletes the current user's profile and all associated data.
 
+    The user's reading events, reading statistics and books are deleted first, in the same
+    transaction, since they reference the user and their user_id columns cannot be null.
+
     Args:
-        db (Session): The database session dependency.
-        current_user (User): The currently authenticated user.
+        db (AsyncSession): The database session dependency.
+        current_user (Principal): The currently authenticated user.
 
     Returns:
         dict: A success message indicating the user profile was deleted.
     """
-    db.delete(current_user)
-    db.commit()
+    for model in (ReadingEvent, DailyReadingStats, UserReadingStats, Book):
+        await db.execute(delete(model).where(model.user_id == current_user.id).execution_options(synchronize_session=False))
+    await db.execute(delete(User).where(User.id == current_user.id).execution_options(synchronize_session=False))
+    await db.commit()
+    await invalidate_principal(current_user.id)
 
     return {"message": "User profile deleted successfully."}
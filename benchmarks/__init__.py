@@ -0,0 +1,6 @@
+"""
+Benchmarks for the self-learning application backend.
+
+Each benchmark is a runnable module, e.g. ``python -m benchmarks.login_throughput``,
+and prints machine-readable JSON so results can be compared between commits.
+"""
@@ -0,0 +1,127 @@
+"""
+Fake Google Books API with latency and error injection.
+
+Serves the two endpoints the backend uses, volume search and volume lookup, with deterministic
+generated volumes. Point the backend at it to test timeouts, the circuit breaker and hedging
+without touching the real API:
+
+    python -m benchmarks.fake_google_books --port 8099 --latency-ms 50 --slow-rate 0.05 --slow-ms 2000 --error-rate 0.1
+    GOOGLE_BOOKS_API_URL=http://127.0.0.1:8099/books/v1/volumes uvicorn backend.main:app
+
+The injection settings can be changed while it runs with ``POST /_control`` and a JSON body
+holding any of ``latency_ms``, ``jitter_ms``, ``slow_rate``, ``slow_ms`` and ``error_rate``,
+e.g. to simulate a brownout in the middle of a benchmark.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+
+from fastapi import Body, FastAPI
+from fastapi.responses import JSONResponse
+
+GENRE_WORDS = ["space", "detective", "dragon", "history", "science", "murder", "magic", "biography", "future", "kingdom"]
+
+
+def fake_volume(volume_id: str, query: str = ""):
+    """
+    Builds a deterministic volume resource for an ID.
+
+    Args:
+        volume_id (str): The volume ID.
+        query (str): The search query the volume was found with, worked into its text.
+
+    Returns:
+        dict: A volume resource shaped like the Google Books API response.
+    """
+    seed = int(hashlib.sha1(volume_id.encode()).hexdigest()[:8], 16)
+    words = [GENRE_WORDS[(seed >> shift) % len(GENRE_WORDS)] for shift in (0, 4, 8, 12)]
+    return {
+        "id": volume_id,
+        "volumeInfo": {
+            "title": f"{query.title()} {words[0].title()} {seed % 1000}".strip(),
+            "authors": [f"Author {seed % 97}"],
+            "description": f"A {words[1]} story about {words[2]} and {words[3]}. {query}".strip(),
+        },
+    }
+
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0, slow_rate: float = 0, slow_ms: float = 0, error_rate: float = 0, page_size: int = 10):
+    """
+    Creates the fake API application.
+
+    Args:
+        latency_ms (float): Base latency added to every response.
+        jitter_ms (float): Maximum random latency added on top of the base latency.
+        slow_rate (float): Fraction of requests delayed by ``slow_ms`` instead.
+        slow_ms (float): Latency of slow requests.
+        error_rate (float): Fraction of requests answered with HTTP 503.
+        page_size (int): Number of volumes returned per search.
+
+    Returns:
+        FastAPI: The application.
+    """
+    app = FastAPI()
+    app.state.injection = {
+        "latency_ms": latency_ms, "jitter_ms": jitter_ms, "slow_rate": slow_rate, "slow_ms": slow_ms, "error_rate": error_rate,
+    }
+    app.state.requests = 0
+
+    async def inject():
+        """
+        Sleeps for the configured latency and returns an error response when one is injected.
+        """
+        app.state.requests += 1
+        injection = app.state.injection
+        if random.random() < injection["slow_rate"]:
+            delay = injection["slow_ms"]
+        else:
+            delay = injection["latency_ms"] + random.uniform(0, injection["jitter_ms"])
+        await asyncio.sleep(delay / 1000)
+        if random.random() < injection["error_rate"]:
+            return JSONResponse({"error": {"code": 503, "message": "Injected failure"}}, status_code=503)
+        return None
+
+    @app.get("/books/v1/volumes")
+    async def search(q: str):
+        error = await inject()
+        if error is not None:
+            return error
+        key = hashlib.sha1(q.lower().encode()).hexdigest()[:6]
+        return {"kind": "books#volumes", "items": [fake_volume(f"{key}{i:04d}", q) for i in range(page_size)]}
+
+    @app.get("/books/v1/volumes/{volume_id}")
+    async def volume(volume_id: str):
+        error = await inject()
+        if error is not None:
+            return error
+        return fake_volume(volume_id)
+
+    @app.post("/_control")
+    async def control(changes: dict = Body(...)):
+        app.state.injection.update({key: float(value) for key, value in changes.items() if key in app.state.injection})
+        return {"injection": app.state.injection, "requests": app.state.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Google Books API with latency and error injection.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="base latency of every response")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="random latency added on top of the base latency")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests answered after --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=2000.0, help="latency of slow requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 503")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.slow_rate, args.slow_ms, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Seeded SQLite fixture for the load tests.
+
+Builds a database at the current schema holding ``users`` users named ``user1`` to ``userN``,
+all with the password ``BENCHMARK_PASSWORD``, and ``books_per_user`` books each with some
+reading progress and favorites. The content is derived from the seed, so two fixtures built
+with the same arguments are identical.
+
+Example:
+    python -m benchmarks.fixtures --path /tmp/bench.db --users 1000 --books-per-user 500
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from passlib.hash import bcrypt
+from sqlalchemy import create_engine, insert
+
+from backend.database.migrations import run_migrations
+from backend.database.models import Book, User
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+TITLE_WORDS = ["Silent", "Red", "Last", "Hidden", "Golden", "Broken", "Winter", "Iron", "Lost", "Endless"]
+TOPIC_WORDS = ["Planet", "Detective", "Dragon", "Empire", "Garden", "Machine", "River", "Kingdom", "Mirror", "Voyage"]
+
+# Rows per INSERT statement
+_CHUNK = 5000
+
+
+def seed_database(path: str, users: int, books_per_user: int, bcrypt_rounds: int, seed: int = 0):
+    """
+    Creates the fixture database, replacing any file at ``path``.
+
+    Args:
+        path (str): The SQLite file to create.
+        users (int): Number of users.
+        books_per_user (int): Number of books in every library.
+        bcrypt_rounds (int): Cost factor of the password hashes; use the server's ``BCRYPT_ROUNDS``
+            so logins do not rehash.
+        seed (int): Seed of the generated content.
+
+    Returns:
+        dict: The fixture parameters and the time it took to build.
+    """
+    started = time.perf_counter()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    # Every user shares one password, so a single slow bcrypt call covers them all
+    password_hash = bcrypt.using(rounds=bcrypt_rounds).hash(BENCHMARK_PASSWORD)
+    created_at = datetime(2024, 1, 1)
+
+    engine = create_engine(f"sqlite:///{path}")
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "id": user_id,
+                "username": f"user{user_id}",
+                "password_hash": password_hash,
+                "email": f"user{user_id}@example.com",
+                "created_at": created_at + timedelta(minutes=user_id),
+                "library_version": 0,
+            }
+            for user_id in range(1, users + 1)
+        ])
+        rows = []
+        for user_id in range(1, users + 1):
+            for _ in range(books_per_user):
+                title = f"{rng.choice(TITLE_WORDS)} {rng.choice(TOPIC_WORDS)} {rng.randrange(1000)}"
+                rows.append({
+                    "title": title,
+                    "author": f"Author {rng.randrange(500)}",
+                    "description": f"A story about the {title.lower()}.",
+                    "user_id": user_id,
+                    "pages_read": rng.randrange(400) if rng.random() < 0.6 else 0,
+                    "is_favorite": rng.random() < 0.1,
+                })
+                if len(rows) == _CHUNK:
+                    conn.execute(insert(Book.__table__), rows)
+                    rows = []
+        if rows:
+            conn.execute(insert(Book.__table__), rows)
+    engine.dispose()
+
+    return {
+        "path": path,
+        "users": users,
+        "books_per_user": books_per_user,
+        "bcrypt_rounds": bcrypt_rounds,
+        "seed": seed,
+        "build_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the seeded SQLite database used by the load tests.")
+    parser.add_argument("--path", default="benchmark.db")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--books-per-user", type=int, default=200)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(seed_database(args.path, args.users, args.books_per_user, args.bcrypt_rounds, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+End-to-end load test of the backend against the fake Google Books API and a seeded database.
+
+Builds the fixture database (``benchmarks.fixtures``), starts the fake Google Books API
+(``benchmarks.fake_google_books``) and the backend under uvicorn as separate processes, then
+runs the scripted scenarios over HTTP:
+
+- ``login_storm``: concurrent ``/auth/login`` calls for random users;
+- ``genre_browsing``: genre searches and genre recommendations, popular genres more often;
+- ``my_books_paging``: walks whole libraries with cursor paging through ``/books/my_books``;
+- ``progress_updates``: ``/books/mark_read`` calls on random books of logged-in users.
+
+Prints one JSON object per scenario and route with the throughput and p50/p95/p99 latencies,
+tagged with the current commit, so runs of two commits can be compared line by line. The
+random choices are seeded, so two runs send the same requests in the same order.
+
+Example:
+    python -m benchmarks.load_test --users 1000 --books-per-user 500 --concurrency 32
+    python -m benchmarks.load_test --scenarios progress_updates --server-env PROGRESS_WRITE_BEHIND=true
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fixtures import BENCHMARK_PASSWORD, seed_database
+from benchmarks.login_throughput import percentile
+
+GENRES = [
+    "Science Fiction", "Mystery", "Fantasy", "Non-fiction", "Romance", "History", "Biography", "Thriller",
+    "Horror", "Poetry", "Philosophy", "Travel", "Cooking", "Psychology", "Economics", "Art",
+]
+
+# Requests per scenario when --requests is not given; my_books_paging counts whole libraries
+DEFAULT_REQUESTS = {
+    "login_storm": 200,
+    "genre_browsing": 2000,
+    "my_books_paging": 200,
+    "progress_updates": 2000,
+}
+
+# Users logged in before the scenarios that need a token
+TOKEN_POOL_SIZE = 50
+
+
+class Recorder:
+    """
+    Collects the latency and status of every request, per route.
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, route: str, status, seconds: float):
+        self.samples.setdefault(route, []).append((status, seconds))
+
+    def summary(self, elapsed: float):
+        """
+        Summarizes the recorded requests.
+
+        Args:
+            elapsed (float): Wall time of the scenario, in seconds.
+
+        Returns:
+            list: One dictionary per route with request and error counts, throughput and latency percentiles.
+        """
+        results = []
+        for route, samples in self.samples.items():
+            latencies = sorted(seconds for _, seconds in samples)
+            statuses = {}
+            for status, _ in samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            errors = sum(1 for status, _ in samples if status == "error" or status >= 400)
+            results.append({
+                "route": route,
+                "requests": len(samples),
+                "errors": errors,
+                "statuses": statuses,
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "latency_ms": {
+                    "mean": round(statistics.mean(latencies) * 1000, 2),
+                    "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                    "p95": round(percentile(latencies, 0.95) * 1000, 2),
+                    "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                    "max": round(latencies[-1] * 1000, 2),
+                },
+            })
+        return results
+
+
+class Context:
+    """
+    State shared by the requests of a scenario.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, libraries: dict, tokens: dict, page_size: int):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.libraries = libraries  # User ID -> (first book ID, last book ID)
+        self.tokens = tokens  # User ID -> Authorization header
+        self.page_size = page_size
+
+    async def request(self, route: str, method: str, url: str, **kwargs):
+        """
+        Sends a request and records its latency under ``route``.
+
+        Returns:
+            httpx.Response: The response, or None when the request failed without one.
+        """
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "error"
+        self.recorder.record(route, status, time.perf_counter() - started)
+        return response
+
+    def random_token_user(self):
+        user_id = self.rng.choice(list(self.tokens))
+        return user_id, self.tokens[user_id]
+
+
+async def login_storm(ctx: Context, _):
+    user_id = ctx.rng.choice(list(ctx.libraries))
+    await ctx.request(
+        "POST /auth/login", "POST", "/auth/login", params={"username": f"user{user_id}", "password": BENCHMARK_PASSWORD}
+    )
+
+
+async def genre_browsing(ctx: Context, _):
+    # Popularity follows a Zipf-like curve: the first genres get most of the traffic
+    genre = ctx.rng.choices(GENRES, weights=[1 / rank for rank in range(1, len(GENRES) + 1)])[0]
+    _, headers = ctx.random_token_user()
+    if ctx.rng.random() < 0.8:
+        await ctx.request("GET /books/search_books/{genre}", "GET", f"/books/search_books/{genre}")
+    else:
+        await ctx.request("GET /books/recommendations", "GET", "/books/recommendations", params={"genre": genre}, headers=headers)
+
+
+async def my_books_paging(ctx: Context, _):
+    _, headers = ctx.random_token_user()
+    cursor = 0
+    while cursor is not None:
+        response = await ctx.request(
+            "GET /books/my_books", "GET", "/books/my_books",
+            params={"cursor": cursor, "limit": ctx.page_size, "fields": "id,title,author"}, headers=headers,
+        )
+        if response is None or response.status_code != 200:
+            return
+        cursor = response.json()["next_cursor"]
+
+
+async def progress_updates(ctx: Context, _):
+    user_id, headers = ctx.random_token_user()
+    first, last = ctx.libraries[user_id]
+    await ctx.request(
+        "POST /books/mark_read", "POST", "/books/mark_read",
+        params={"book_id": ctx.rng.randint(first, last), "pages_read": ctx.rng.randrange(1, 500)}, headers=headers,
+    )
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "genre_browsing": genre_browsing,
+    "my_books_paging": my_books_paging,
+    "progress_updates": progress_updates,
+}
+
+
+async def run_scenario(scenario, ctx: Context, requests: int, concurrency: int):
+    """
+    Runs ``requests`` iterations of a scenario with at most ``concurrency`` in flight.
+
+    Returns:
+        float: The wall time in seconds.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with semaphore:
+            await scenario(ctx, index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    return time.perf_counter() - started
+
+
+async def log_in(client: httpx.AsyncClient, user_ids: list):
+    """
+    Logs in the given users, outside of any measurement.
+
+    Returns:
+        dict: User ID -> Authorization header.
+    """
+    async def one(user_id):
+        response = await client.post("/auth/login", params={"username": f"user{user_id}", "password": BENCHMARK_PASSWORD})
+        response.raise_for_status()
+        return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return dict(await asyncio.gather(*(one(user_id) for user_id in user_ids)))
+
+
+def read_libraries(path: str):
+    """
+    Reads the range of book IDs of every user from the fixture database.
+
+    Returns:
+        dict: User ID -> (first book ID, last book ID).
+    """
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT user_id, MIN(id), MAX(id) FROM books GROUP BY user_id ORDER BY user_id").fetchall()
+    finally:
+        conn.close()
+    return {user_id: (first, last) for user_id, first, last in rows}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_process(arguments: list, url: str, env: dict, timeout: float = 60.0):
+    """
+    Starts a server process and waits until ``url`` answers.
+
+    Returns:
+        subprocess.Popen: The running process.
+    """
+    process = subprocess.Popen([sys.executable, *arguments], env=env)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(arguments)} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{url} did not answer within {timeout} seconds")
+
+
+def stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args, base_url: str, libraries: dict):
+    """
+    Runs the selected scenarios against the backend and prints the results.
+    """
+    commit = current_commit()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        rng = random.Random(args.seed)
+        token_users = sorted(rng.sample(list(libraries), min(TOKEN_POOL_SIZE, len(libraries))))
+        tokens = await log_in(client, token_users)
+
+        for name in args.scenarios:
+            recorder = Recorder()
+            ctx = Context(client, recorder, random.Random(f"{args.seed}:{name}"), libraries, tokens, args.page_size)
+            requests = args.requests or DEFAULT_REQUESTS[name]
+            elapsed = await run_scenario(SCENARIOS[name], ctx, requests, args.concurrency)
+            for result in recorder.summary(elapsed):
+                print(json.dumps({
+                    "benchmark": "load_test",
+                    "commit": commit,
+                    "scenario": name,
+                    "concurrency": args.concurrency,
+                    "elapsed_seconds": round(elapsed, 3),
+                    **result,
+                }), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=0, help="iterations per scenario, 0 uses the scenario default")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout per request, in seconds")
+    parser.add_argument("--page-size", type=int, default=100, help="limit used by my_books_paging")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="", help="fixture path, a temporary file by default")
+    parser.add_argument("--reuse-database", action="store_true", help="keep an existing fixture instead of rebuilding it")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--books-per-user", type=int, default=200)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--server-env", action="append", default=[], metavar="NAME=VALUE",
+        help="extra backend setting, e.g. PROGRESS_WRITE_BEHIND=true; may be repeated",
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    database = args.database or os.path.join(workdir, "benchmark.db")
+    if not (args.reuse_database and os.path.exists(database)):
+        fixture = seed_database(database, args.users, args.books_per_user, args.bcrypt_rounds, args.seed)
+        print(json.dumps({"benchmark": "load_test", "fixture": fixture}), flush=True)
+    libraries = read_libraries(database)
+
+    fake_port, backend_port = free_port(), free_port()
+    fake = start_process(
+        [
+            "-m", "benchmarks.fake_google_books", "--port", str(fake_port),
+            "--latency-ms", str(args.upstream_latency_ms), "--jitter-ms", str(args.upstream_jitter_ms),
+            "--error-rate", str(args.upstream_error_rate),
+        ],
+        f"http://127.0.0.1:{fake_port}/books/v1/volumes/ping",
+        dict(os.environ),
+    )
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{database}",
+        GOOGLE_BOOKS_API_URL=f"http://127.0.0.1:{fake_port}/books/v1/volumes",
+        BCRYPT_ROUNDS=str(args.bcrypt_rounds),
+        CACHE_WARM_QUERIES="",  # Background refreshes would make runs differ
+    )
+    for item in args.server_env:
+        name, _, value = item.partition("=")
+        env[name.upper()] = value
+    try:
+        backend = start_process(
+            ["-m", "uvicorn", "backend.main:app", "--port", str(backend_port), "--log-level", "warning"],
+            f"http://127.0.0.1:{backend_port}/",
+            env,
+        )
+        try:
+            asyncio.run(run_benchmark(args, f"http://127.0.0.1:{backend_port}", libraries))
+        finally:
+            stop_process(backend)
+    finally:
+        stop_process(fake)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Login throughput benchmark for the password hashing process pool.
+
+Runs many concurrent password verifications, the expensive part of ``/auth/login``, through
+``backend.password_hashing`` for each requested pool size and prints one JSON object per size
+with the achieved logins per second and latency percentiles. Use it to choose
+``PASSWORD_HASH_WORKERS`` for a host.
+
+Example:
+    python -m benchmarks.login_throughput --workers 1 2 4 --logins 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from backend import password_hashing
+from backend.config import get_settings
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which the given fraction of the sorted values fall.
+
+    Args:
+        values (list): The measured values, sorted in ascending order.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile value.
+    """
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+async def run_logins(hashed: str, logins: int, concurrency: int):
+    """
+    Verifies the benchmark password ``logins`` times with at most ``concurrency`` calls in flight.
+
+    Returns:
+        tuple: The wall time in seconds and the sorted per-login latencies in seconds.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def login():
+        async with semaphore:
+            started = time.perf_counter()
+            matches, _ = await password_hashing.verify_password_async("benchmark-password", hashed)
+            latencies.append(time.perf_counter() - started)
+            assert matches
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    hashed = password_hashing.hash_password("benchmark-password")
+    for workers in sorted(set(args.workers)):
+        password_hashing.start_hash_pool(max_workers=workers, max_pending=args.concurrency)
+        # Warm up every worker process before measuring
+        asyncio.run(run_logins(hashed, workers, workers))
+        elapsed, latencies = asyncio.run(run_logins(hashed, args.logins, args.concurrency))
+        print(json.dumps({
+            "benchmark": "login_throughput",
+            "bcrypt_rounds": get_settings().bcrypt_rounds,
+            "workers": workers,
+            "logins": args.logins,
+            "concurrency": args.concurrency,
+            "logins_per_second": round(args.logins / elapsed, 2),
+            "latency_ms": {
+                "mean": round(statistics.mean(latencies) * 1000, 2),
+                "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            },
+        }))
+    password_hashing.shutdown_hash_pool()
+
+
+if __name__ == "__main__":
+    main()
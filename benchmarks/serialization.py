@@ -0,0 +1,103 @@
+"""
+Serialization benchmark for large book lists.
+
+Measures the per-book cost of turning a ``/books/my_books`` page into JSON bytes, before and
+after the switch to typed response models and the orjson response class:
+
+- ``orm_jsonable_encoder``: SQLAlchemy ``Book`` instances through FastAPI's ``jsonable_encoder``
+  and ``json.dumps``, as the route originally did;
+- ``dict_jsonable_encoder``: plain dictionaries through the same generic path;
+- ``response_model_json``: validated against ``MyBooksPage`` and dumped by Pydantic, the path of
+  routes with a response model;
+- ``response_model_orjson``: validated against ``MyBooksPage`` and encoded by ``FastJSONResponse``;
+- ``fast_json_response``: plain dictionaries encoded by ``FastJSONResponse`` directly, as
+  ``/books/my_books`` does now.
+
+Prints one JSON object per variant and list size.
+
+Example:
+    python -m benchmarks.serialization --books 100 1000 10000
+"""
+
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend.database.models import Book
+from backend.responses import FastJSONResponse
+from backend.schemas import MyBooksPage
+
+
+def make_books(count: int):
+    """
+    Builds ``count`` book dictionaries shaped like the rows of ``/books/my_books``.
+    """
+    return [
+        {
+            "id": book_id,
+            "title": f"Book title number {book_id}",
+            "author": "Firstname Lastname",
+            "description": "A moderately long description of the book. " * 5,
+            "pages_read": book_id % 400,
+            "is_favorite": book_id % 7 == 0,
+        }
+        for book_id in range(1, count + 1)
+    ]
+
+
+def variants(books: list):
+    """
+    Returns the serialization variants, each a function producing the JSON bytes of one page.
+    """
+    orm_books = [Book(user_id=1, **book) for book in books]
+    page = {"books": books, "next_cursor": None}
+    adapter = TypeAdapter(MyBooksPage)
+    response = FastJSONResponse(None)
+
+    return {
+        "orm_jsonable_encoder": lambda: json.dumps(jsonable_encoder(orm_books)).encode("utf-8"),
+        "dict_jsonable_encoder": lambda: json.dumps(jsonable_encoder(page)).encode("utf-8"),
+        "response_model_json": lambda: adapter.dump_json(adapter.validate_python(page), exclude_unset=True),
+        "response_model_orjson": lambda: response.render(
+            adapter.dump_python(adapter.validate_python(page), mode="json", exclude_unset=True)
+        ),
+        "fast_json_response": lambda: response.render(page),
+    }
+
+
+def measure(function, repeat: int):
+    """
+    Returns the best wall time of ``repeat`` calls of ``function``, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-book JSON serialization cost of book lists.")
+    parser.add_argument("--books", type=int, nargs="+", default=[100, 1000, 10000], help="list sizes to measure")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best one is reported")
+    args = parser.parse_args()
+
+    for count in args.books:
+        books = make_books(count)
+        for name, function in variants(books).items():
+            seconds = measure(function, args.repeat)
+            print(json.dumps({
+                "variant": name,
+                "books": count,
+                "bytes": len(function()),
+                "total_ms": round(seconds * 1000, 3),
+                "per_book_us": round(seconds / count * 1e6, 3),
+            }))
+
+
+if __name__ == "__main__":
+    main()
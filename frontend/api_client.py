@@ -0,0 +1,207 @@
+"""
+This module is the desktop client's access layer to the backend API.
+
+Every call goes through one shared ``requests.Session``, so connections to the backend are
+kept alive and reused, and runs on a small pool of worker threads, so the PySimpleGUI event
+loop never waits on the network. Results are delivered back to a window as
+``API_RESULT_EVENT`` events carrying an ``ApiResult``, and the number of calls in flight is
+reported with ``API_BUSY_EVENT`` events to drive a loading indicator.
+
+Calls of the same kind supersede each other: when the user clicks another genre before the
+previous search finished, the previous request is cancelled if it has not started yet, and
+its result is dropped if it has.
+"""
+
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# API configuration (adjust as needed)
+API_BASE_URL = "http://127.0.0.1:8000"
+
+# Window events sent by the client
+API_RESULT_EVENT = "-API-RESULT-"
+API_BUSY_EVENT = "-API-BUSY-"
+
+# Seconds to wait for the connection and for the response
+DEFAULT_TIMEOUT = (3.05, 20)
+
+
+class ApiResult:
+    """
+    The outcome of one API call, delivered to the window as the value of ``API_RESULT_EVENT``.
+
+    Attributes:
+        kind (str): The kind of call, e.g. ``"search"``; the window dispatches on it.
+        request_id (int): The ID returned by ``ApiClient.submit``.
+        status (int | None): The HTTP status code, or None if no response arrived.
+        data: The decoded JSON body, or None.
+        error (str | None): A message for the user when the call failed.
+        context (dict): The values passed to ``submit``, e.g. the selected book.
+    """
+
+    __slots__ = ("kind", "request_id", "status", "data", "error", "context")
+
+    def __init__(self, kind, request_id, status=None, data=None, error=None, context=None):
+        self.kind = kind
+        self.request_id = request_id
+        self.status = status
+        self.data = data
+        self.error = error
+        self.context = context or {}
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class ApiClient:
+    """
+    Runs backend API calls on worker threads and posts their results to a window.
+
+    Args:
+        base_url (str): The backend URL.
+        max_workers (int): Number of calls that can run at the same time.
+        timeout (tuple): Connect and read timeouts, in seconds.
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, max_workers: int = 4, timeout=DEFAULT_TIMEOUT):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.token = None
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._latest = {}  # kind -> (request ID, future) of the call whose result is still wanted
+        self._in_flight = 0
+        self._window = None
+
+    def bind(self, window):
+        """
+        Sets the window results are delivered to by default.
+
+        Args:
+            window (sg.Window): The main window.
+        """
+        self._window = window
+
+    def submit(self, kind: str, method: str, path: str, params=None, json=None, window=None, timeout=None, **context):
+        """
+        Starts an API call in the background, superseding any unfinished call of the same kind.
+
+        Args:
+            kind (str): The kind of call, used to dispatch the result and to supersede older calls.
+            method (str): The HTTP method.
+            path (str): The path below the backend URL, e.g. ``/books/my_books``.
+            params (dict, optional): The query parameters.
+            json (optional): The JSON body.
+            window (sg.Window, optional): The window receiving the result, defaults to the bound window.
+            timeout (optional): Timeouts overriding the client default.
+            **context: Values handed back in ``ApiResult.context``.
+
+        Returns:
+            int: The request ID.
+        """
+        request_id = next(self._ids)
+        target = window or self._window
+        with self._lock:
+            previous = self._latest.get(kind)
+            self._in_flight += 1
+            future = self._executor.submit(
+                self._run, kind, request_id, target, method, path, params, json, timeout or self.timeout, context
+            )
+            self._latest[kind] = (request_id, future)
+        future.add_done_callback(lambda _: self._finished(target))  # Also runs for cancelled calls
+        if previous is not None:
+            previous[1].cancel()  # Never sent if it is still queued; its result is dropped otherwise
+        self._post(target, API_BUSY_EVENT, self.in_flight)
+        return request_id
+
+    def cancel(self, kind: str):
+        """
+        Cancels the unfinished call of a kind. Its result, if it still arrives, is dropped.
+
+        Args:
+            kind (str): The kind of call.
+        """
+        with self._lock:
+            latest = self._latest.pop(kind, None)
+        if latest is not None:
+            latest[1].cancel()
+
+    @property
+    def in_flight(self):
+        """
+        int: Number of calls submitted and not finished yet.
+        """
+        return self._in_flight
+
+    def call(self, method: str, path: str, params=None, json=None, timeout=None):
+        """
+        Sends an API call on the calling thread and waits for it. For scripts, not for event loops.
+
+        Returns:
+            ApiResult: The outcome of the call.
+        """
+        return self._send("call", 0, method, path, params, json, timeout or self.timeout, {})
+
+    def _send(self, kind, request_id, method, path, params, json, timeout, context):
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else None
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}", params=params, json=json, headers=headers, timeout=timeout
+            )
+        except requests.Timeout:
+            return ApiResult(kind, request_id, error="The server took too long to answer.", context=context)
+        except requests.RequestException as e:
+            return ApiResult(kind, request_id, error=f"Could not reach the server: {e}", context=context)
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        error = None
+        if response.status_code >= 400:
+            detail = data.get("detail") if isinstance(data, dict) else None
+            error = detail if isinstance(detail, str) else f"The server answered with HTTP {response.status_code}."
+        return ApiResult(kind, request_id, status=response.status_code, data=data, error=error, context=context)
+
+    def _run(self, kind, request_id, window, method, path, params, json, timeout, context):
+        result = self._send(kind, request_id, method, path, params, json, timeout, context)
+        with self._lock:
+            current = self._latest.get(kind, (None, None))[0] == request_id
+            if current:
+                del self._latest[kind]
+        if current:
+            self._post(window, API_RESULT_EVENT, result)
+
+    def _finished(self, window):
+        with self._lock:
+            self._in_flight -= 1
+        self._post(window, API_BUSY_EVENT, self.in_flight)
+
+    @staticmethod
+    def _post(window, event, value):
+        if window is None:
+            return
+        try:
+            window.write_event_value(event, value)
+        except Exception:
+            pass  # The window was closed while the call ran
+
+    def close(self):
+        """
+        Drops queued calls, stops the worker threads and closes the pooled connections.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+# The client shared by every window of the application
+api = ApiClient()
@@ -0,0 +1,181 @@
+"""
+This module holds the rows behind the book tables of the desktop client.
+
+Rows are kept in a dictionary keyed by book ID, so a selected table row resolves to its book
+in constant time, together with the IDs currently shown, in order. Pages fetched from the
+backend's cursor-paginated ``/books/my_books`` are appended as they arrive, and only the new
+rows are run through the filter; narrowing the filter text only re-checks the rows already
+shown. The table itself only holds what has been fetched so far, so even a large library
+opens as soon as its first page arrives.
+"""
+
+import PySimpleGUI as sg
+
+# Rows fetched per page, and the columns requested for them
+PAGE_SIZE = 100
+PAGE_FIELDS = "id,title,author"
+
+# Fraction of the table scrolled past after which the next page is fetched
+LOAD_MORE_THRESHOLD = 0.9
+
+# Milliseconds between two checks of the scroll position while more pages exist
+SCROLL_POLL_MS = 150
+
+# Suffix of the event reported when a table row is double-clicked, see bind_open_event
+OPEN_EVENT_SUFFIX = "+OPEN"
+
+
+class BookList:
+    """
+    The books of one table, with their filter and paging state.
+
+    Args:
+        paged (bool): Whether more pages can be fetched from ``/books/my_books``.
+    """
+
+    def __init__(self, paged: bool = False):
+        self.rows = {}  # book ID -> book, in the order received
+        self.visible = []  # IDs of the rows matching the filter, in table order
+        self.filter_text = ""
+        self.next_cursor = 0 if paged else None
+        self.loading = False
+        self._search_keys = {}  # book ID -> lower-cased text the filter is matched against
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def add_books(self, books, next_cursor=None):
+        """
+        Appends a page of books, showing those matching the current filter.
+
+        Args:
+            books (list): The books, each with at least an ``id``.
+            next_cursor (int, optional): The cursor of the next page, None after the last page.
+
+        Returns:
+            int: Number of the new books that are shown.
+        """
+        shown = 0
+        for book in books:
+            book_id = book["id"]
+            if book_id not in self.rows:
+                self._search_keys[book_id] = f"{book.get('title', '')} {book.get('author', '')}".lower()
+                if self._matches(book_id, self.filter_text):
+                    self.visible.append(book_id)
+                    shown += 1
+            self.rows[book_id] = book
+        self.next_cursor = next_cursor
+        self.loading = False
+        return shown
+
+    def set_filter(self, text: str):
+        """
+        Shows only the books whose title or author contains the text, case-insensitively.
+
+        When the new text contains the previous one, only the rows shown so far are checked again.
+
+        Args:
+            text (str): The filter text.
+
+        Returns:
+            bool: Whether the shown rows changed.
+        """
+        text = text.strip().lower()
+        if text == self.filter_text:
+            return False
+        candidates = self.visible if self.filter_text in text else self.rows
+        self.visible = [book_id for book_id in candidates if self._matches(book_id, text)]
+        self.filter_text = text
+        return True
+
+    def _matches(self, book_id, text):
+        return not text or text in self._search_keys[book_id]
+
+    def book_at(self, index: int):
+        """
+        Args:
+            index (int): A row index of the table.
+
+        Returns:
+            dict | None: The book shown on that row.
+        """
+        if 0 <= index < len(self.visible):
+            return self.rows[self.visible[index]]
+        return None
+
+    def table_values(self):
+        """
+        Returns:
+            list: The table rows, one ``[title, author]`` list per shown book.
+        """
+        rows = self.rows
+        return [[rows[book_id].get("title", ""), rows[book_id].get("author", "")] for book_id in self.visible]
+
+    def wants_more(self, scrolled_to: float):
+        """
+        Tells whether the next page should be fetched.
+
+        Args:
+            scrolled_to (float): Fraction of the table above the bottom of the view, 1.0 when the end is shown.
+
+        Returns:
+            bool: True if more pages exist, none is being fetched and the view is near the end.
+        """
+        return self.has_more and not self.loading and scrolled_to >= LOAD_MORE_THRESHOLD
+
+
+def book_table(key: str):
+    """
+    Creates the table element listing the books of a ``BookList``.
+
+    Args:
+        key (str): The element key.
+
+    Returns:
+        sg.Table: The table, empty until the first rows arrive.
+    """
+    return sg.Table(
+        values=[], headings=["Title", "Author"], key=key, num_rows=20, auto_size_columns=False,
+        col_widths=[40, 25], justification="left", select_mode=sg.TABLE_SELECT_MODE_BROWSE, enable_events=True,
+    )
+
+
+def bind_open_event(window, key: str):
+    """
+    Reports double clicks on the rows of a table as ``key + OPEN_EVENT_SUFFIX``.
+
+    Args:
+        window (sg.Window): The finalized window holding the table.
+        key (str): The table key.
+    """
+    window[key].bind("<Double-Button-1>", OPEN_EVENT_SUFFIX)
+
+
+def scrolled_to(window, key: str):
+    """
+    Args:
+        window (sg.Window): The window holding the table.
+        key (str): The table key.
+
+    Returns:
+        float: Fraction of the table above the bottom of the view, 1.0 when the end is shown.
+    """
+    return window[key].Widget.yview()[1]
+
+
+def refresh_table(window, key: str, book_list: BookList, keep_position: bool = True):
+    """
+    Shows the rows of a ``BookList`` in its table.
+
+    Args:
+        window (sg.Window): The window holding the table.
+        key (str): The table key.
+        book_list (BookList): The rows to show.
+        keep_position (bool): Whether to keep the scroll position, e.g. when a page was appended.
+    """
+    table = window[key]
+    top = table.Widget.yview()[0] if keep_position else 0.0
+    table.update(values=book_list.table_values())
+    table.Widget.yview_moveto(top)
+    window.refresh()  # Lays out the new rows, so scrolled_to reflects them
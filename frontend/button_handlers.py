@@ -1,56 +1,93 @@
-import requests
+"""
+This module holds the actions behind the buttons of the desktop client.
+
+Each action starts a backend call through the shared client in ``api_client`` and returns at
+once, so the window stays responsive however slow the backend is. The window receives the
+outcome as an ``API_RESULT_EVENT`` and hands it to the matching result handler.
+
+Calls are keyed by kind: a new search replaces a search still running, and a new change to a
+book replaces an unfinished change of the same kind to that book.
+"""
+
 import PySimpleGUI as sg
 
-# Define the API base URL (adjust as necessary)
-API_BASE_URL = "http://127.0.0.1:8000"
+from api_client import api
+from book_list import PAGE_FIELDS, PAGE_SIZE
+
+
+def login(username, password):
+    return api.submit("login", "POST", "/auth/login", params={"username": username, "password": password})
+
 
 def handle_genre_selection(genre):
     # Fetch books by genre
-    response = requests.get(f"{API_BASE_URL}/books/search_books/{genre}")
-    if response.status_code == 200:
-        books = response.json().get("books", [])
-        return books
-    else:
-        sg.popup("Error: Could not fetch books.")
-        return []
+    return api.submit("search", "GET", f"/books/search_books/{genre}", genre=genre)
+
 
-def view_my_books():
+def view_my_books(cursor=0, window=None):
     """
-    Fetch the books that the user has added or marked as favorites.
+    Fetch one page of the books that the user has added or marked as favorites.
     Communicates with the FastAPI backend.
+
+    Args:
+        cursor (int): The ``next_cursor`` of the previous page, 0 for the first page.
+        window (sg.Window, optional): The window receiving the page.
     """
-    try:
-        response = requests.get(f"{API_BASE_URL}/books/my_books")
-        if response.status_code == 200:
-            books = response.json().get("books", [])
-            return books
-        else:
-            sg.popup("Error: Could not fetch your books from the backend.")
-            return []
-    except requests.RequestException as e:
-        sg.popup(f"An error occurred while fetching your books: {e}")
-        return []
+    return api.submit(
+        "my_books", "GET", "/books/my_books",
+        params={"cursor": cursor, "limit": PAGE_SIZE, "fields": PAGE_FIELDS}, window=window,
+    )
+
 
 def handle_book_selection(book_id):
     sg.popup(f"Book {book_id} selected")
 
-def mark_book_as_read(book_id, pages_read):
-    response = requests.post(f"{API_BASE_URL}/books/mark_read", json={"book_id": book_id, "pages_read": pages_read})
-    if response.status_code == 200:
-        sg.popup(f"Book marked as read. Pages read: {pages_read}")
-    else:
-        sg.popup("Error: Could not mark the book as read.")
 
-def add_book_to_favorites(book_id):
-    response = requests.post(f"{API_BASE_URL}/books/add_favorite", json={"book_id": book_id})
-    if response.status_code == 200:
-        sg.popup(f"Book added to favorites.")
-    else:
-        sg.popup("Error: Could not add book to favorites.")
+def add_book_to_my_books(volume_id, window=None):
+    """
+    Add a book found by a genre search to the user's books.
+
+    Args:
+        volume_id (str): The Google Books volume ID of the search result.
+        window (sg.Window, optional): The window receiving the result.
+    """
+    return api.submit(f"add_book:{volume_id}", "POST", "/books/add_book", params={"book_id": volume_id}, window=window)
 
-def remove_book_from_favorites(book_id):
-    response = requests.post(f"{API_BASE_URL}/books/remove_favorite", json={"book_id": book_id})
-    if response.status_code == 200:
-        sg.popup(f"Book removed from favorites.")
+
+def mark_book_as_read(book_id, pages_read, window=None):
+    return api.submit(
+        f"mark_read:{book_id}", "POST", "/books/mark_read",
+        params={"book_id": book_id, "pages_read": pages_read}, window=window, pages_read=pages_read,
+    )
+
+
+def add_book_to_favorites(book_id, window=None):
+    return api.submit(f"favorite:{book_id}", "POST", "/books/add_favorite", params={"book_id": book_id}, window=window)
+
+
+def remove_book_from_favorites(book_id, window=None):
+    return api.submit(f"favorite:{book_id}", "POST", "/books/remove_favorite", params={"book_id": book_id}, window=window)
+
+
+def show_action_result(result):
+    """
+    Tells the user how a change to a book went.
+
+    Args:
+        result (ApiResult): The result of an add, mark-as-read or favorite call.
+    """
+    if result.ok:
+        sg.popup(result.data.get("message", "Done."))
     else:
-        sg.popup("Error: Could not remove book from favorites.")
+        sg.popup(f"Error: {result.error}")
+
+
+def show_loading(window, in_flight):
+    """
+    Shows the loading indicator of a window while calls are running.
+
+    Args:
+        window (sg.Window): A window with a ``-STATUS-`` text element.
+        in_flight (int): Number of calls in flight.
+    """
+    window["-STATUS-"].update("Loading..." if in_flight else "")
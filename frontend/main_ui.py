@@ -1,45 +1,172 @@
 import PySimpleGUI as sg
-from button_handlers import handle_genre_selection, handle_book_selection, mark_book_as_read, add_book_to_favorites, remove_book_from_favorites, view_my_books
+from api_client import API_BUSY_EVENT, API_RESULT_EVENT, api
+from book_list import OPEN_EVENT_SUFFIX, SCROLL_POLL_MS, BookList, bind_open_event, book_table, refresh_table, scrolled_to
+from button_handlers import (
+    add_book_to_favorites, add_book_to_my_books, handle_genre_selection, login, mark_book_as_read, remove_book_from_favorites,
+    show_action_result, show_loading, view_my_books,
+)
 
 # Define the layout of the user interface
 layout = [
     [sg.Text("Select a Genre for Book Recommendations:")],
     [sg.Button("Science Fiction"), sg.Button("Mystery"), sg.Button("Fantasy")],
     [sg.Button("View My Books")],  # New button for viewing user's books
+    [sg.Text("", key="-STATUS-", size=(30, 1))],  # Loading indicator
     [sg.Button("Exit")]
 ]
 
-# Create the window
-window = sg.Window("Book Search", layout)
+# Create the window; results of background calls are delivered to it as events
+window = sg.Window("Book Search", layout, finalize=True)
+api.bind(window)
 
-def show_book_options(book_id, book_title):
+def ask_credentials():
+    """
+    Asks for the username and password and starts logging in.
+    """
+    username = sg.popup_get_text("Username:", "Log In")
+    if username:
+        password = sg.popup_get_text("Password:", "Log In", password_char="*")
+        login(username, password or "")
+
+def show_book_options(book_id, book_title, owned=True):
     """
     Display additional options for the selected book (mark as read, add to favorites, etc.).
+
+    Books found by a genre search are identified by their Google Books volume ID and can only be
+    added to the user's books; the other actions need the ID of a book the user owns.
     """
+    if owned:
+        actions = [sg.Button("Mark as Read"), sg.Button("Add to Favorites"), sg.Button("Remove from Favorites")]
+    else:
+        actions = [sg.Button("Add to My Books")]
     book_options_layout = [
         [sg.Text(f"Selected Book: {book_title}")],
-        [sg.Button("Mark as Read"), sg.Button("Add to Favorites"), sg.Button("Remove from Favorites")],
+        actions,
+        [sg.Text("", key="-STATUS-", size=(30, 1))],
         [sg.Button("Back to Genre Selection")]
     ]
-    
-    book_options_window = sg.Window("Book Options", book_options_layout)
-    
+
+    book_options_window = sg.Window("Book Options", book_options_layout, finalize=True)
+
     while True:
-        event, _ = book_options_window.read()
-        
+        event, values = book_options_window.read()
+
         if event == sg.WINDOW_CLOSED or event == "Back to Genre Selection":
             break
+        elif event == "Add to My Books":
+            add_book_to_my_books(book_id, window=book_options_window)
         elif event == "Mark as Read":
             pages_read = sg.popup_get_text("Enter the number of pages read:", "Mark as Read")
             if pages_read:
-                mark_book_as_read(book_id, pages_read)
+                mark_book_as_read(book_id, pages_read, window=book_options_window)
         elif event == "Add to Favorites":
-            add_book_to_favorites(book_id)
+            add_book_to_favorites(book_id, window=book_options_window)
         elif event == "Remove from Favorites":
-            remove_book_from_favorites(book_id)
-    
+            remove_book_from_favorites(book_id, window=book_options_window)
+        elif event == API_RESULT_EVENT:
+            show_action_result(values[API_RESULT_EVENT])
+        elif event == API_BUSY_EVENT:
+            show_loading(book_options_window, values[API_BUSY_EVENT])
+
     book_options_window.close()
 
+def show_book_list(title, book_list, owned=True):
+    """
+    Lists books in a table the user can filter, and opens the options of the book they pick.
+    ``owned`` tells whether the books are the user's own or search results.
+
+    When the list is paged, the next page of the user's books is fetched whenever the table is
+    scrolled near its end, or does not fill the view.
+    """
+    book_list_layout = [
+        [sg.Text("Filter:"), sg.Input(key="-FILTER-", size=(40, 1), enable_events=True)],
+        [book_table("-BOOKS-")],
+        [sg.Text("", key="-COUNT-", size=(30, 1)), sg.Text("", key="-STATUS-", size=(30, 1))],
+        [sg.Button("Open"), sg.Button("Close")]
+    ]
+
+    book_list_window = sg.Window(title, book_list_layout, finalize=True)
+    bind_open_event(book_list_window, "-BOOKS-")
+    show_books(book_list_window, book_list)
+
+    while True:
+        if book_list.wants_more(scrolled_to(book_list_window, "-BOOKS-")):
+            book_list.loading = True
+            view_my_books(book_list.next_cursor, window=book_list_window)
+
+        # While more pages exist, wake up regularly to check how far the table was scrolled
+        event, values = book_list_window.read(timeout=SCROLL_POLL_MS if book_list.has_more else None)
+
+        if event == sg.WINDOW_CLOSED or event == "Close":
+            break
+        elif event == "-FILTER-":
+            if book_list.set_filter(values["-FILTER-"]):
+                show_books(book_list_window, book_list, keep_position=False)
+        elif event in ("Open", "-BOOKS-" + OPEN_EVENT_SUFFIX):
+            book = book_list.book_at(values["-BOOKS-"][0]) if values["-BOOKS-"] else None
+            if book is not None:
+                show_book_options(book["id"], f"{book['title']} by {book['author']}", owned)
+        elif event == API_RESULT_EVENT:
+            result = values[API_RESULT_EVENT]
+            if result.ok:
+                book_list.add_books(result.data.get("books", []), result.data.get("next_cursor"))
+                show_books(book_list_window, book_list)
+            else:
+                # Stop paging rather than retrying on every scroll check
+                book_list.loading = False
+                book_list.next_cursor = None
+                sg.popup(f"An error occurred while fetching your books: {result.error}")
+        elif event == API_BUSY_EVENT:
+            show_loading(book_list_window, values[API_BUSY_EVENT])
+
+    api.cancel("my_books")
+    book_list_window.close()
+
+def show_books(book_list_window, book_list, keep_position=True):
+    """
+    Shows the rows of a book list and how many of them match the filter.
+    """
+    refresh_table(book_list_window, "-BOOKS-", book_list, keep_position)
+    if book_list.rows or book_list.has_more:
+        count = f"{len(book_list.visible)} of {len(book_list.rows)} books"
+    else:
+        count = "No books found in your collection."
+    book_list_window["-COUNT-"].update(count)
+
+def show_search_results(result):
+    """
+    Lists the books found for a genre.
+    """
+    if not result.ok:
+        sg.popup(f"Error: {result.error}")
+        return
+    books = result.data.get("books", [])
+    if not books:
+        sg.popup(f"No books found for {result.context['genre']}.")
+        return
+
+    book_list = BookList()
+    book_list.add_books(books)
+    show_book_list(f"{result.context['genre']} Books", book_list, owned=False)
+
+def handle_login(result):
+    """
+    Keeps the token of a successful login, or asks again.
+    """
+    if result.ok:
+        api.token = result.data["access_token"]
+    else:
+        sg.popup(f"Login failed: {result.error}")
+        ask_credentials()
+
+# Handlers of the results delivered by the API client, by kind of call
+result_handlers = {
+    "login": handle_login,
+    "search": show_search_results,
+}
+
+ask_credentials()
+
 # Main event loop to process user input
 while True:
     event, values = window.read()
@@ -47,29 +174,20 @@ while True:
     if event == sg.WINDOW_CLOSED or event == "Exit":
         break
     elif event in ["Science Fiction", "Mystery", "Fantasy"]:
-        books = handle_genre_selection(event)
-        
-        if books:
-            book_titles = [f"{book['title']} by {book['author']}" for book in books]
-            selected_book = sg.popup_get_text("Select a book from the list:\n" + "\n".join(book_titles), "Select a Book")
-            
-            if selected_book:
-                for book in books:
-                    if f"{book['title']} by {book['author']}" == selected_book:
-                        book_id = book['id']
-                        show_book_options(book_id, selected_book)
-                        break
-        else:
-            sg.popup(f"No books found for {event}.")
-    
+        handle_genre_selection(event)
+
     # Handle "View My Books" button
     elif event == "View My Books":
-        my_books = view_my_books()  # Fetch books from the backend
-        if my_books:
-            book_list = "\n".join([f"{book['title']} by {book['author']}" for book in my_books])
-            sg.popup(f"My Books:\n\n{book_list}")
-        else:
-            sg.popup("No books found in your collection.")
-
-# Close the window
+        show_book_list("My Books", BookList(paged=True))  # Pages are fetched as the list is scrolled
+
+    # Results of background calls and the loading indicator
+    elif event == API_RESULT_EVENT:
+        result = values[API_RESULT_EVENT]
+        handler = result_handlers.get(result.kind.partition(":")[0], show_action_result)
+        handler(result)
+    elif event == API_BUSY_EVENT:
+        show_loading(window, values[API_BUSY_EVENT])
+
+# Close the window, dropping any calls still queued
 window.close()
+api.close()
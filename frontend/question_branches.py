@@ -6,7 +6,7 @@ Communication between the frontend and backend is handled via a custom API.
 All functions follow PEP8 style guidelines, and user data is handled securely, adhering to GDPR compliance.
 """
 
-from button_handlers import handle_genre_selection
+from api_client import api
 
 # Global variable to store user session data
 TOKEN = None
@@ -43,15 +43,16 @@ def get_book_recommendations(genre: str):
     Returns:
         dict: A dictionary containing book recommendations fetched from the backend.
     """
-    response = handle_genre_selection(genre, TOKEN)
-    if 'books' in response:
+    api.token = TOKEN
+    result = api.call("GET", f"/books/search_books/{genre}")
+    if result.ok and 'books' in result.data:
         return {
             "message": f"Recommendations for {genre}",
-            "books": response['books']
+            "books": result.data['books']
         }
     else:
         return {
-            "message": f"Failed to fetch recommendations for {genre}. Error: {response.get('error', 'Unknown error')}"
+            "message": f"Failed to fetch recommendations for {genre}. Error: {result.error or 'Unknown error'}"
         }
 
 
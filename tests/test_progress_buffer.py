@@ -0,0 +1,75 @@
+"""
+Tests of the write-behind progress buffer against a fixture database.
+"""
+
+import asyncio
+import os
+import tempfile
+
+import httpx
+from sqlalchemy import create_engine, select
+
+from backend.config import Settings, use_settings
+
+# The settings must be in place before the backend modules reading them are imported
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "progress_buffer.db")
+use_settings(Settings(
+    database_url=f"sqlite:///{DATABASE_PATH}",
+    progress_write_behind=True,
+    progress_flush_interval_seconds=3600,
+    progress_flush_max_pending=1000,
+))
+
+from benchmarks.fixtures import seed_database  # noqa: E402
+from backend import progress_buffer as progress_buffer_module  # noqa: E402
+from backend.application import create_app  # noqa: E402
+from backend.auth import create_access_token  # noqa: E402
+from backend.database.models import Book  # noqa: E402
+
+seed_database(DATABASE_PATH, users=1, books_per_user=2, bcrypt_rounds=4)
+app = create_app()
+HEADERS = {"Authorization": f"Bearer {create_access_token({'sub': 'user1'})}"}
+
+
+def stored_pages_read(book_id):
+    engine = create_engine(f"sqlite:///{DATABASE_PATH}")
+    try:
+        with engine.connect() as conn:
+            return conn.scalar(select(Book.pages_read).where(Book.id == book_id))
+    finally:
+        engine.dispose()
+
+
+def test_batch_during_flush_is_not_overwritten(monkeypatch):
+    buffer = progress_buffer_module.progress_buffer
+    record_progress = progress_buffer_module.record_progress
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            book_id = (await client.get("/books/my_books", headers=HEADERS)).json()["books"][0]["id"]
+            response = await client.post("/books/mark_read", params={"book_id": book_id, "pages_read": 50}, headers=HEADERS)
+            assert response.status_code == 200
+
+            # Send the batch while the flush writing 50 is between its UPDATE and its commit
+            async def record_progress_then_batch(db, user_id, changes, when=None):
+                response = await client.post(
+                    "/books/batch", json={"operations": [{"op": "mark_read", "book_id": book_id, "pages_read": 100}]},
+                    headers=HEADERS,
+                )
+                assert response.json()["results"][0]["status"] == "ok"
+                await record_progress(db, user_id, changes, when)
+
+            monkeypatch.setattr(progress_buffer_module, "record_progress", record_progress_then_batch)
+            await buffer.flush()
+            monkeypatch.setattr(progress_buffer_module, "record_progress", record_progress)
+
+            assert buffer.pending_for_user(1) == {book_id: 100}
+            listed = (await client.get("/books/my_books", headers=HEADERS)).json()["books"][0]
+            assert listed["pages_read"] == 100
+
+            await buffer.flush()
+            assert len(buffer) == 0
+            return book_id
+
+    book_id = asyncio.run(scenario())
+    assert stored_pages_read(book_id) == 100